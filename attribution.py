@@ -0,0 +1,95 @@
+# Per-user factor attribution for the Sure Circle trust forest
+import numpy as np
+from scipy import sparse
+
+# Rows per apply/decision_path call; the leaf matrix holds rows x trees entries and
+# the path indicator rows x trees x depth
+ATTRIBUTION_CHUNK_ROWS = 4096
+
+# Largest dense per-node contribution table kept in memory before falling back
+# to the sparse decision-path product
+ATTRIBUTION_TABLE_MAX_BYTES = 256 * 2**20
+
+class ForestAttribution:
+    """
+    Decision-path attribution for a fitted RandomForestRegressor
+
+    Every split moves the running prediction from the parent node's value to the
+    child's value; that change is credited to the feature the parent split on.
+    Summed over a sample's path and averaged over trees this gives an exact
+    decomposition: bias + contributions.sum(axis=1) == forest.predict(X).
+
+    The tree structure is cached once per forest. When it fits in
+    ATTRIBUTION_TABLE_MAX_BYTES, every node stores its cumulative root-to-node
+    contribution vector, so each chunk of rows costs one forest.apply plus one
+    gather per tree. Larger forests keep only the sparse per-node deltas and multiply them
+    with the decision-path indicator chunk by chunk.
+    """
+
+    def __init__(self, forest, n_features):
+        self.forest = forest
+        self.n_features = n_features
+
+        rows, cols, deltas, roots, offsets = [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            values = tree.value[:, 0, 0]
+            internal = np.flatnonzero(tree.children_left >= 0)
+
+            for children in (tree.children_left[internal], tree.children_right[internal]):
+                rows.append(children + offset)
+                cols.append(tree.feature[internal])
+                deltas.append(values[children] - values[internal])
+
+            roots.append(values[0])
+            offsets.append(offset)
+            offset += tree.node_count
+
+        self.bias = float(np.mean(roots))
+        self.tree_offsets = np.array(offsets)
+        self.node_deltas = sparse.csr_matrix(
+            (np.concatenate(deltas), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, n_features)
+        )
+
+        self.node_table = None
+        if offset * n_features * 8 <= ATTRIBUTION_TABLE_MAX_BYTES:
+            self.node_table = self._cumulative_table(offset)
+
+    def _cumulative_table(self, total_nodes):
+        """Root-to-node contribution sums for every node, built level by level"""
+        table = np.zeros((total_nodes, self.n_features))
+        node_deltas = self.node_deltas.tocoo()
+        table[node_deltas.row, node_deltas.col] = node_deltas.data
+
+        for estimator, offset in zip(self.forest.estimators_, self.tree_offsets):
+            tree = estimator.tree_
+            parents = np.array([0])
+            while len(parents):
+                parents = parents[tree.children_left[parents] >= 0]
+                for children in (tree.children_left[parents], tree.children_right[parents]):
+                    table[children + offset] += table[parents + offset]
+                parents = np.concatenate((tree.children_left[parents], tree.children_right[parents]))
+
+        return table
+
+    def explain(self, features_scaled):
+        """Return (bias, N x n_features contribution matrix) in score points"""
+        features_scaled = np.asarray(features_scaled, dtype=np.float32)
+        contributions = np.zeros((len(features_scaled), self.n_features))
+
+        for start in range(0, len(features_scaled), ATTRIBUTION_CHUNK_ROWS):
+            stop = start + ATTRIBUTION_CHUNK_ROWS
+            if self.node_table is not None:
+                leaves = self.forest.apply(features_scaled[start:stop])
+                leaves += self.tree_offsets
+                chunk = contributions[start:stop]
+                for t in range(leaves.shape[1]):
+                    chunk += self.node_table[leaves[:, t]]
+            else:
+                indicator, _ = self.forest.decision_path(features_scaled[start:stop])
+                contributions[start:stop] = (indicator @ self.node_deltas).toarray()
+
+        contributions /= len(self.forest.estimators_)
+        return self.bias, contributions
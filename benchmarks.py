@@ -0,0 +1,164 @@
+# Benchmark suite for the Sure Circle trust-scoring hot paths
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import sklearn
+
+from script_1 import SureCircleTrustScorer
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Scalar paths are timed per user on a capped sample; throughput extrapolates per row
+SCALAR_SAMPLE_CAP = 2_000
+
+def _rows(columns):
+    """List-of-dicts view of columnar data, as the scalar API expects"""
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*(columns[k].tolist() for k in keys))]
+
+def _summarize(name, n, latencies, items, peak_bytes):
+    """Collapse per-call latencies into one result row"""
+    latencies = np.asarray(latencies)
+    return {
+        'benchmark': name,
+        'n': n,
+        'calls': len(latencies),
+        'throughput_per_s': items / latencies.sum() if latencies.sum() > 0 else float('inf'),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'peak_mb': peak_bytes / 2**20
+    }
+
+def _run(name, n, calls, items):
+    """
+    Time each (fn, args) call, then re-run the first one under tracemalloc for peak memory
+    Timing and memory are measured separately because tracemalloc slows Python code down
+    """
+    latencies = []
+    for fn, args in calls:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn, args = calls[0]
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return _summarize(name, n, latencies, items, peak)
+
+def run_benchmarks(sizes=DEFAULT_SIZES, chunk_size=1_000_000, max_train=100_000, seed=42):
+    """Run every benchmark at every population size and return the result rows"""
+    scorer = SureCircleTrustScorer()
+    scorer.train_model(scorer.generate_synthetic_columns(min(max_train, 20_000), seed))
+    results = []
+
+    for n in sizes:
+        print(f"📏 Population size {n:,}")
+        first_row = len(results)
+        chunk = min(n, chunk_size)
+        n_chunks = -(-n // chunk)
+        # One generated chunk is reused across the population so memory stays bounded
+        population_chunk = scorer.generate_synthetic_columns(chunk, seed)
+        sample = scorer.generate_synthetic_columns(min(n, SCALAR_SAMPLE_CAP), seed)
+        sample_rows = _rows(sample)
+
+        def batch_calls(fn):
+            return [(fn, (population_chunk,))] * n_chunks
+
+        # 1. Synthetic data generation
+        results.append(_run('generate_synthetic_data', n,
+                            [(scorer.generate_synthetic_data, (len(sample_rows),))], len(sample_rows)))
+        results.append(_run('generate_synthetic_columns', n,
+                            [(scorer.generate_synthetic_columns, (chunk, i)) for i in range(n_chunks)], n))
+
+        # 2. Feature extraction, scalar vs batch
+        results.append(_run('create_features', n,
+                            [(scorer.create_features, (u,)) for u in sample_rows], len(sample_rows)))
+        results.append(_run('create_features_batch', n, batch_calls(scorer.create_features_batch), n))
+
+        # 3. Scoring, scalar vs batch
+        results.append(_run('predict_trust_score', n,
+                            [(scorer.predict_trust_score, (u,)) for u in sample_rows[:500]],
+                            len(sample_rows[:500])))
+        results.append(_run('predict_trust_scores', n, batch_calls(scorer.predict_trust_scores), n))
+
+        # 4. Training, capped at max_train rows
+        n_train = min(n, max_train)
+        train_data = scorer.generate_synthetic_columns(n_train, seed)
+        trained = SureCircleTrustScorer()
+        results.append(_run('train_model', n_train, [(trained.train_model, (train_data,))], n_train))
+
+        # 5. Artifact cold start for the model trained at this size
+        with tempfile.TemporaryDirectory() as tmp:
+            path = trained.save(os.path.join(tmp, 'model.joblib'))
+            results.append(_run('artifact_load', n_train,
+                                [(SureCircleTrustScorer.load, (path,)) for _ in range(5)], 5))
+
+        for row in results[first_row:]:
+            print(f"   - {row['benchmark']}: {row['throughput_per_s']:,.0f}/s "
+                  f"p50 {row['p50_ms']:.3f}ms p99 {row['p99_ms']:.3f}ms peak {row['peak_mb']:.1f}MB")
+
+    return results
+
+def compare_results(current, baseline, tolerance=0.2):
+    """
+    Compare throughput against a baseline run
+    Returns the (benchmark, n) rows that regressed by more than tolerance
+    """
+    baseline_rows = {(r['benchmark'], r['n']): r for r in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        base = baseline_rows.get((row['benchmark'], row['n']))
+        if base is None:
+            continue
+        ratio = row['throughput_per_s'] / base['throughput_per_s']
+        if ratio < 1 - tolerance:
+            regressions.append({'benchmark': row['benchmark'], 'n': row['n'], 'ratio': ratio})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the trust-scoring hot paths")
+    parser.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')], default=DEFAULT_SIZES,
+                        help="comma-separated population sizes")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--max-train', type=int, default=100_000)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="baseline results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': run_benchmarks(args.sizes, args.chunk_size, args.max_train)
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"❌ {r['benchmark']} @ {r['n']:,}: {r['ratio']:.0%} of baseline throughput")
+        if regressions:
+            return 1
+        print("✅ No throughput regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# Claim anomaly pre-screening for Sure Circle pools
+import json
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from solvency import CLAIMS_PER_MEMBER_MONTH
+
+# Weight of each anomaly signal in the combined score
+SCREENING_WEIGHTS = {
+    'pool_amount': 0.75,
+    'category_amount': 0.75,
+    'coverage_ratio': 1.5,
+    'claim_frequency': 0.75,
+    'report_delay': 0.5
+}
+SCREENING_SIGNALS = list(SCREENING_WEIGHTS)
+
+# Combined score at which a claim goes to under_review instead of voting
+SUSPICION_THRESHOLD = 4.0
+
+# Claim statuses whose amounts form the baselines; unscreened and rejected claims are left out
+BASELINE_STATUSES = ('voting', 'approved', 'paid')
+
+class ClaimStatisticsIndex:
+    """
+    Running log-amount statistics per pool, per category and overall (Welford updates)
+    Small groups are shrunk towards the overall baseline with prior_weight pseudo-claims,
+    so a new pool or category does not flag every claim.
+    """
+
+    def __init__(self, prior_weight=10):
+        self.prior_weight = prior_weight
+        self._groups = {}
+
+    def _update(self, key, value):
+        stats = self._groups.setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        delta = value - stats[1]
+        stats[1] += delta / stats[0]
+        stats[2] += delta * (value - stats[1])
+
+    def update(self, pool_ids, categories, amounts):
+        """Add claims to the pool, category and overall baselines"""
+        for pool_id, category, amount in zip(pool_ids, categories, amounts):
+            value = math.log1p(max(amount, 0))
+            self._update(('pool', pool_id), value)
+            self._update(('category', category), value)
+            self._update(('all', None), value)
+
+    def _overall(self):
+        count, mean, m2 = self._groups.get(('all', None), (0, 0.0, 0.0))
+        return mean, (m2 / count if count > 1 else 1.0)
+
+    def baseline(self, kind, keys):
+        """Shrunk (mean, std) of log amounts for each key of one kind ('pool' or 'category')"""
+        global_mean, global_var = self._overall()
+        k = self.prior_weight
+        means = np.empty(len(keys))
+        variances = np.empty(len(keys))
+        for i, key in enumerate(keys):
+            count, mean, m2 = self._groups.get((kind, key), (0, 0.0, 0.0))
+            means[i] = (count * mean + k * global_mean) / (count + k)
+            variances[i] = (m2 + k * global_var) / (count + k)
+        return means, np.sqrt(np.maximum(variances, 1e-12))
+
+    @classmethod
+    def from_store(cls, store, prior_weight=10, batch_size=50_000):
+        """Build the index from claims already accepted for voting or approved"""
+        index = cls(prior_weight)
+        placeholders = ', '.join('?' * len(BASELINE_STATUSES))
+        for rows in store.iter_query(
+            f"SELECT pool_id, category, amount_requested FROM claims "
+            f"WHERE status IN ({placeholders}) AND amount_requested IS NOT NULL",
+            BASELINE_STATUSES, batch_size
+        ):
+            index.update([r['pool_id'] for r in rows], [r['category'] for r in rows],
+                         [r['amount_requested'] for r in rows])
+        return index
+
+class ClaimScreener:
+    """
+    Scores newly submitted claims against pool and category baselines before voting
+
+    Signals (each >= 0, larger is more unusual):
+      pool_amount / category_amount  z-score of log amount above the shrunk baseline
+      coverage_ratio                 amount requested / pool coverage_limit
+      claim_frequency                claimant's other claims in the past year, in
+                                     Poisson standard deviations above the expected rate
+      report_delay                   months between incident and submission; an incident
+                                     dated after submission counts as 3
+    The weighted sum is the anomaly score; claims at or above threshold move to
+    under_review, the rest to voting. Accepted claims then join the baselines.
+    """
+
+    def __init__(self, store, index=None, threshold=SUSPICION_THRESHOLD, weights=None):
+        self.store = store
+        self.index = index if index is not None else ClaimStatisticsIndex.from_store(store)
+        self.threshold = threshold
+        self.weights = np.array([(weights or SCREENING_WEIGHTS)[name] for name in SCREENING_SIGNALS])
+        store.connection.execute("CREATE INDEX IF NOT EXISTS idx_claims_status_created_at ON claims (status, created_at)")
+
+    def score_claims(self, claims, prior_claims=None):
+        """
+        Anomaly scores for a batch of claim dicts (pool_id, category, amount_requested,
+        incident_date, created_at, optional coverage_limit); prior_claims is the
+        claimant's other claims in the past year per claim (zeros if omitted)
+        Returns dict of anomaly_score, suspicious, signals (n x len(SCREENING_SIGNALS))
+        and reasons (signal names per claim, strongest first)
+        """
+        n = len(claims)
+        amounts = np.array([c.get('amount_requested') or 0.0 for c in claims], dtype=np.float64)
+        log_amounts = np.log1p(np.maximum(amounts, 0))
+        signals = np.zeros((n, len(SCREENING_SIGNALS)))
+
+        # 1. Amount against the pool and category baselines
+        for column, kind, field in ((0, 'pool', 'pool_id'), (1, 'category', 'category')):
+            mean, std = self.index.baseline(kind, [c.get(field) for c in claims])
+            signals[:, column] = np.maximum((log_amounts - mean) / std, 0)
+
+        # 2. Share of the pool's coverage limit requested
+        coverage = np.array([c.get('coverage_limit') or np.inf for c in claims], dtype=np.float64)
+        signals[:, 2] = amounts / coverage
+
+        # 3. Claim frequency against the Poisson rate generate_synthetic_data assumes
+        expected = 12 * CLAIMS_PER_MEMBER_MONTH
+        prior = np.zeros(n) if prior_claims is None else np.asarray(prior_claims, dtype=np.float64)
+        signals[:, 3] = np.maximum(prior - expected, 0) / math.sqrt(expected)
+
+        # 4. Reporting delay between incident and submission
+        for i, claim in enumerate(claims):
+            incident, submitted = claim.get('incident_date'), claim.get('created_at')
+            if incident and submitted:
+                days = (datetime.fromisoformat(str(submitted)[:10])
+                        - datetime.fromisoformat(str(incident)[:10])).days
+                signals[i, 4] = 3.0 if days < 0 else days / 30
+
+        scores = signals @ self.weights
+        order = np.argsort(-(signals * self.weights), axis=1)
+        reasons = [
+            [SCREENING_SIGNALS[j] for j in order[i] if signals[i, j] * self.weights[j] >= 1.0]
+            for i in range(n)
+        ]
+        return {'anomaly_score': scores, 'suspicious': scores >= self.threshold, 'signals': signals, 'reasons': reasons}
+
+    def screen_submitted(self, batch_size=1_000, now=None):
+        """
+        Screen up to batch_size submitted claims (oldest first) and move each to voting
+        or under_review in one transaction; returns counts and the flagged claim_ids
+        """
+        now = now or datetime.now()
+        year_ago = (now - timedelta(days=365)).isoformat(sep=' ', timespec='seconds')
+
+        with self.store.transaction() as connection:
+            claims = [dict(row) for row in connection.execute("""
+                SELECT c.claim_id, c.pool_id, c.claimant_id, c.category, c.amount_requested,
+                       c.incident_date, c.created_at, p.coverage_limit
+                FROM claims c LEFT JOIN pools p ON p.pool_id = c.pool_id
+                WHERE c.status = 'submitted'
+                ORDER BY c.created_at LIMIT ?
+            """, (batch_size,))]
+            if not claims:
+                return {'screened': 0, 'voting': 0, 'under_review': 0, 'flagged': []}
+
+            # Past-year claims per claimant in one grouped query; each claim's own row is
+            # then taken back out of its claimant's count
+            year_counts = dict(connection.execute("""
+                SELECT claimant_id, COUNT(*) FROM claims
+                WHERE claimant_id IN (SELECT value FROM json_each(?)) AND created_at >= ?
+                GROUP BY claimant_id
+            """, (json.dumps(list({claim['claimant_id'] for claim in claims} - {None})), year_ago)).fetchall())
+            prior_claims = [
+                year_counts.get(claim['claimant_id'], 0)
+                - (claim['created_at'] is not None and str(claim['created_at']) >= year_ago)
+                for claim in claims
+            ]
+            results = self.score_claims(claims, prior_claims)
+
+            updates = []
+            for claim, suspicious, score, reasons in zip(
+                claims, results['suspicious'], results['anomaly_score'], results['reasons']
+            ):
+                if suspicious:
+                    note = f"Automatic screening: anomaly score {score:.2f} ({', '.join(reasons)})"
+                    updates.append(('under_review', note, claim['claim_id']))
+                else:
+                    updates.append(('voting', None, claim['claim_id']))
+            connection.executemany(
+                "UPDATE claims SET status = ?, reviewer_notes = COALESCE(?, reviewer_notes) WHERE claim_id = ?",
+                updates
+            )
+
+        accepted = [claim for claim, suspicious in zip(claims, results['suspicious']) if not suspicious]
+        self.index.update([c['pool_id'] for c in accepted], [c['category'] for c in accepted],
+                          [c['amount_requested'] or 0.0 for c in accepted])
+
+        flagged = [claim['claim_id'] for claim, suspicious in zip(claims, results['suspicious']) if suspicious]
+        return {'screened': len(claims), 'voting': len(claims) - len(flagged), 'under_review': len(flagged),
+                'flagged': flagged}
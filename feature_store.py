@@ -0,0 +1,168 @@
+# Incremental feature store for Sure Circle trust scoring
+import math
+from datetime import datetime
+
+from script_1 import FEATURE_INPUTS
+
+# Profile fields that come from the user record rather than from activity events
+PROFILE_FIELDS = (
+    'months_active', 'successful_referrals', 'kyc_verified',
+    'document_verification_score', 'avg_peer_rating', 'trusted_connections',
+    'coverage_limit'
+)
+
+class IncrementalFeatureStore:
+    """
+    Running per-user aggregates for create_features, keyed by user_id
+    Every activity event updates the counters in O(1), instead of reloading every
+    contribution, claim and vote the way TrustScoreService.gatherUserData does
+    """
+
+    def __init__(self):
+        self._aggregates = {}
+        self._dirty = set()
+
+    def __len__(self):
+        return len(self._aggregates)
+
+    def __contains__(self, user_id):
+        return user_id in self._aggregates
+
+    def _user(self, user_id):
+        agg = self._aggregates.get(user_id)
+        if agg is None:
+            agg = {
+                'total_contributions': 0,
+                'on_time_contributions': 0,
+                'claims_submitted': 0,
+                'approved_claims': 0,
+                'claim_amount_total': 0.0,
+                'voting_opportunities': 0,
+                'votes_participated': 0,
+                'disputes_raised': 0,
+                # Welford running statistics over contribution amounts
+                'payment_count': 0,
+                'payment_mean': 0.0,
+                'payment_m2': 0.0,
+                'contribution_month_keys': set(),
+                'profile': {}
+            }
+            self._aggregates[user_id] = agg
+        self._dirty.add(user_id)
+        return agg
+
+    # Activity events
+
+    def record_contribution(self, user_id, amount, on_time=True, created_at=None):
+        """Record one contribution payment"""
+        agg = self._user(user_id)
+        agg['total_contributions'] += 1
+        if on_time:
+            agg['on_time_contributions'] += 1
+
+        # Welford update for payment amount variance
+        agg['payment_count'] += 1
+        delta = amount - agg['payment_mean']
+        agg['payment_mean'] += delta / agg['payment_count']
+        agg['payment_m2'] += delta * (amount - agg['payment_mean'])
+
+        created_at = created_at or datetime.now()
+        agg['contribution_month_keys'].add((created_at.year, created_at.month))
+
+    def record_claim(self, user_id, amount_requested, approved=False):
+        """Record a submitted claim; pass approved=True if it is already approved"""
+        agg = self._user(user_id)
+        agg['claims_submitted'] += 1
+        agg['claim_amount_total'] += amount_requested
+        if approved:
+            agg['approved_claims'] += 1
+
+    def record_claim_approved(self, user_id):
+        """Record that one of the user's previously submitted claims was approved"""
+        agg = self._user(user_id)
+        agg['approved_claims'] = min(agg['approved_claims'] + 1, agg['claims_submitted'])
+
+    def record_vote(self, user_id, participated=True):
+        """Record a voting opportunity, and whether the user actually voted"""
+        agg = self._user(user_id)
+        agg['voting_opportunities'] += 1
+        if participated:
+            agg['votes_participated'] += 1
+
+    def record_dispute(self, user_id):
+        """Record a dispute raised by the user"""
+        self._user(user_id)['disputes_raised'] += 1
+
+    def apply_event(self, event):
+        """Dispatch an activity event dict by its 'type' field"""
+        event_type = event.get('type')
+        user_id = event['user_id']
+
+        if event_type == 'contribution':
+            self.record_contribution(user_id, event['amount'], event.get('on_time', True), event.get('created_at'))
+        elif event_type == 'claim':
+            self.record_claim(user_id, event['amount_requested'], event.get('approved', False))
+        elif event_type == 'claim_approved':
+            self.record_claim_approved(user_id)
+        elif event_type == 'vote':
+            self.record_vote(user_id, event.get('participated', True))
+        elif event_type == 'dispute':
+            self.record_dispute(user_id)
+        else:
+            raise ValueError(f"Unknown activity event type: {event_type}")
+
+    def update_profile(self, user_id, **fields):
+        """Set user-record inputs (KYC, peer rating, tenure...); marks dirty only on change"""
+        unknown = set(fields) - set(PROFILE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {sorted(unknown)}")
+
+        agg = self._aggregates.get(user_id)
+        if agg is not None and all(agg['profile'].get(k) == v for k, v in fields.items()):
+            return
+        self._user(user_id)['profile'].update(fields)
+
+    # Feature inputs
+
+    def get_inputs(self, user_id):
+        """Current create_features input dict for one user"""
+        agg = self._aggregates[user_id]
+
+        # Coefficient of variation of contribution amounts, as in calculatePaymentStability
+        payment_variance = 0.0
+        if agg['payment_count'] >= 2 and agg['payment_mean'] > 0:
+            std = math.sqrt(agg['payment_m2'] / agg['payment_count'])
+            payment_variance = min(std / agg['payment_mean'], 1.0)
+
+        inputs = {
+            'total_contributions': agg['total_contributions'],
+            'on_time_contributions': agg['on_time_contributions'],
+            'contribution_months': len(agg['contribution_month_keys']),
+            'payment_variance': payment_variance,
+            'claims_submitted': agg['claims_submitted'],
+            'approved_claims': agg['approved_claims'],
+            'avg_claim_amount': agg['claim_amount_total'] / max(agg['claims_submitted'], 1),
+            'voting_opportunities': agg['voting_opportunities'],
+            'votes_participated': agg['votes_participated'],
+            'disputes_raised': agg['disputes_raised']
+        }
+        for field in PROFILE_FIELDS:
+            inputs[field] = agg['profile'].get(field, FEATURE_INPUTS[field])
+        return inputs
+
+    def dirty_users(self):
+        """User ids whose feature inputs changed since the last rescore"""
+        return list(self._dirty)
+
+    def rescore_dirty(self, scorer, top_k=5):
+        """
+        Rescore only the users whose inputs changed, in one bulk predict call
+        Returns (user_ids, predict_trust_scores result) and clears the dirty set
+        """
+        user_ids = list(self._dirty)
+        if not user_ids:
+            return user_ids, None
+
+        results = scorer.predict_trust_scores([self.get_inputs(uid) for uid in user_ids], top_k)
+        self._dirty.clear()
+        return user_ids, results
@@ -0,0 +1,183 @@
+# Flat-array inference engine for the Sure Circle trust model
+import numpy as np
+
+COMPILED_FOREST_VERSION = 1
+
+# Arrays stored in a compiled forest file
+COMPILED_FOREST_ARRAYS = (
+    'feature', 'threshold', 'child', 'value', 'roots', 'tree_weight', 'forest_trees',
+    'base_score', 'max_depth', 'scaler_mean', 'scaler_scale', 'band_names', 'band_table',
+    'feature_names'
+)
+
+def _sklearn_tree_nodes(tree):
+    """(left, right, feature, threshold, value) arrays of a fitted sklearn Tree"""
+    return (tree.children_left, tree.children_right, tree.feature,
+            tree.threshold, tree.value[:, 0, 0])
+
+def _hist_tree_nodes(predictor):
+    """Same arrays for a HistGradientBoosting TreePredictor"""
+    nodes = predictor.nodes
+    leaf = nodes['is_leaf'].astype(bool)
+    left = np.where(leaf, -1, nodes['left'].astype(np.int64))
+    right = np.where(leaf, -1, nodes['right'].astype(np.int64))
+    return left, right, nodes['feature_idx'], nodes['num_threshold'], nodes['value']
+
+def _relayout(left, right, feature, threshold, value, offset, feature_offset):
+    """
+    Renumber one tree breadth-first so both children of a node are adjacent
+    (right child = left child + 1). Leaves point at themselves with an infinite
+    threshold, so a fixed number of descent steps parks every row on its leaf.
+    feature_offset selects which copy of the scaled row the tree reads (see predict).
+    Returns (feature, threshold, child, value, depth) for the renumbered tree.
+    """
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    new_id = np.empty(len(left), dtype=np.int64)
+    levels = []
+    level = np.array([0])
+    next_id = 0
+    while len(level):
+        new_id[level] = np.arange(next_id, next_id + len(level))
+        next_id += len(level)
+        levels.append(level)
+        internal = level[left[level] >= 0]
+        level = np.column_stack((left[internal], right[internal])).ravel()
+    order = np.concatenate(levels)
+
+    is_leaf = left[order] < 0
+    out_feature = np.where(is_leaf, 0, feature[order]).astype(np.int64) + feature_offset
+    out_threshold = np.where(is_leaf, np.inf, np.asarray(threshold, dtype=np.float64)[order])
+    out_child = np.where(is_leaf, new_id[order], new_id[np.where(is_leaf, 0, left[order])]) + offset
+    return out_feature, out_threshold, out_child, np.asarray(value, dtype=np.float64)[order], len(levels) - 1
+
+class CompiledForest:
+    """
+    Trained trust model flattened into NumPy node arrays, scaler included
+
+    Every tree of the forest (and of the boosting model, when the ensemble serves)
+    lives in the same feature/threshold/child/value arrays. Prediction walks all
+    trees at once: each step gathers the split feature and threshold for the
+    current node of every (row, tree) pair and moves to child + (x > threshold).
+    Only NumPy is needed to load and run it.
+
+    The scaler is applied to the row rather than folded into the thresholds:
+    sklearn decision trees compare float32-rounded inputs, and folding changes
+    that rounding enough to flip a few leaves per thousand. Each row is scaled
+    once into a float32-rounded copy (read by RF/GB trees) and a float64 copy
+    (read by HistGradientBoosting trees), which reproduces sklearn exactly.
+    """
+
+    def __init__(self, arrays):
+        for name in COMPILED_FOREST_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.forest_trees = int(self.forest_trees)
+        self.base_score = float(self.base_score)
+        self.max_depth = int(self.max_depth)
+
+    @classmethod
+    def from_scorer(cls, scorer):
+        """Compile a trained SureCircleTrustScorer: forest, optional boost model, scaler and bands"""
+        if scorer.model is None:
+            raise ValueError("Model not trained yet")
+
+        n_features = len(scorer.scaler.mean_)
+        n_forest = len(scorer.model.estimators_)
+        boost = scorer.boost_model
+
+        # Each tree's weight in the final score; the served ensemble is (forest + boost) / 2
+        forest_weight = 1.0 if boost is None else 0.5
+        # Entries are (node arrays, weight, feature offset): 0 reads float32-rounded inputs, n_features float64
+        trees = [(_sklearn_tree_nodes(est.tree_), forest_weight / n_forest, 0) for est in scorer.model.estimators_]
+        base_score = 0.0
+        if boost is not None and hasattr(boost, '_predictors'):
+            trees += [(_hist_tree_nodes(p[0]), 0.5, n_features) for p in boost._predictors]
+            base_score = 0.5 * float(np.ravel(boost._baseline_prediction)[0])
+        elif boost is not None:
+            trees += [(_sklearn_tree_nodes(est[0].tree_), 0.5 * boost.learning_rate, 0) for est in boost.estimators_]
+            if boost.init_ != 'zero':
+                base_score = 0.5 * float(boost.init_.predict(np.zeros((1, n_features)))[0])
+
+        parts = {'feature': [], 'threshold': [], 'child': [], 'value': []}
+        roots, depths = [], []
+        offset = 0
+        for nodes, _, feature_offset in trees:
+            feature, threshold, child, value, depth = _relayout(*nodes, offset, feature_offset)
+            for name, array in zip(parts, (feature, threshold, child, value)):
+                parts[name].append(array)
+            roots.append(offset)
+            depths.append(depth)
+            offset += len(feature)
+
+        names, table = scorer._band_table()
+        arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+        arrays.update({
+            'roots': np.array(roots, dtype=np.int64),
+            'tree_weight': np.array([weight for _, weight, _ in trees]),
+            'forest_trees': n_forest,
+            'base_score': base_score,
+            'max_depth': max(depths),
+            'scaler_mean': scorer.scaler.mean_,
+            'scaler_scale': scorer.scaler.scale_,
+            'band_names': names.astype(str),
+            'band_table': table,
+            'feature_names': np.array(list(scorer.feature_importance), dtype=str)
+        })
+        return cls(arrays)
+
+    def save(self, path):
+        """Write all arrays to one uncompressed .npz file"""
+        np.savez(path, version=COMPILED_FOREST_VERSION,
+                 **{name: np.asarray(getattr(self, name)) for name in COMPILED_FOREST_ARRAYS})
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a compiled forest written by save(); needs NumPy only"""
+        with np.load(path) as data:
+            if int(data['version']) != COMPILED_FOREST_VERSION:
+                raise ValueError(f"Unsupported compiled forest version: {int(data['version'])}")
+            return cls({name: data[name] for name in COMPILED_FOREST_ARRAYS})
+
+    def leaves(self, features):
+        """Leaf node index of every (row, tree) pair for raw, unscaled feature rows"""
+        X_scaled = (np.atleast_2d(np.asarray(features, dtype=np.float64)) - self.scaler_mean) / self.scaler_scale
+        X = np.hstack((X_scaled.astype(np.float32), X_scaled))
+        feature, threshold, child = self.feature, self.threshold, self.child
+
+        if len(X) == 1:
+            # Latency path for one user: 1-D walk over the trees, no row offsets
+            x = X[0]
+            node = self.roots.copy()
+            for _ in range(self.max_depth):
+                node = child[node] + (x[feature[node]] > threshold[node])
+            return node[None, :]
+
+        flat_X = X.ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        node = np.tile(self.roots, (len(X), 1))
+        for _ in range(self.max_depth):
+            node = child[node] + (flat_X[row_offsets + feature[node]] > threshold[node])
+        return node
+
+    def predict(self, features, confidence_spread_scale=100.0):
+        """Return (raw scores, confidence) for raw feature rows from create_features_batch"""
+        leaf_values = self.value[self.leaves(features)]
+        raw_scores = self.base_score + leaf_values @ self.tree_weight
+
+        # Confidence from the forest trees' spread, as in SureCircleTrustScorer._forest_predict
+        forest_values = leaf_values[:, :self.forest_trees]
+        forest_mean = forest_values.mean(axis=1)
+        spread = np.sqrt(np.maximum((forest_values * forest_values).mean(axis=1) - forest_mean * forest_mean, 0))
+        confidence = np.clip(1 - spread / confidence_spread_scale, 0.7, 0.95)
+        return raw_scores, confidence
+
+    def predict_trust_scores(self, features):
+        """Scores, bands and confidence with the same clamping as SureCircleTrustScorer"""
+        raw_scores, confidence = self.predict(features)
+        trust_scores = np.clip(np.trunc(raw_scores), 300, 900).astype(np.int64)
+        return {
+            'trust_score': trust_scores,
+            'score_band': self.band_names[self.band_table[trust_scores - 300]],
+            'prediction_confidence': confidence
+        }
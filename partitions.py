@@ -0,0 +1,224 @@
+# Month-partitioned storage and columnar archive for high-volume Sure Circle tables
+import os
+import re
+import uuid
+from datetime import date, datetime
+
+from storage import PARTITION_SUMMARY_COLUMNS, _column_ddl, _partition_table
+from streaming import _require_pyarrow
+
+# Append-heavy tables that are read mostly by recent time window
+PARTITIONED_TABLES = ('contributions', 'user_activities')
+
+# SQLite column type -> Arrow type name for archive files
+ARCHIVE_TYPES = {'TEXT': 'string', 'INTEGER': 'int64', 'REAL': 'float64'}
+
+def month_key(value):
+    """'YYYY-MM' month of a datetime, date or ISO timestamp string"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m')
+    if isinstance(value, str) and re.match(r"^\d{4}-\d{2}", value):
+        return value[:7]
+    raise ValueError(f"Cannot derive a month from {value!r}")
+
+def _timestamp(value):
+    return value.isoformat(sep=' ', timespec='seconds') if isinstance(value, datetime) else str(value)
+
+class MonthPartitionedTable:
+    """
+    One physical SQLite table per calendar month for contributions or user_activities
+
+    Rows are routed by created_at into <table>_<YYYY>_<MM> partitions, each with its
+    own (user_id, created_at) index and copies of the user_aggregates triggers, so
+    materialized scorer inputs stay current. partition_catalog records every month
+    and where it lives. Window queries touch only the months they overlap (partition
+    pruning). compact() moves old months into one Parquet file per month and drops
+    the SQLite partition; queries read archived months from those files transparently.
+    Archived months also keep per-user summaries in partition_summaries, which
+    TrustStore.feature_inputs and rebuild_aggregates read alongside live partitions.
+    """
+
+    def __init__(self, store, table, archive_dir='archive'):
+        if table not in PARTITIONED_TABLES:
+            raise ValueError(f"Table {table} is not partitioned; choose from {PARTITIONED_TABLES}")
+        self.store = store
+        self.table = table
+        self.columns = store.schema[table]
+        self.primary_key = next(name for name, column in self.columns.items() if column['primary_key'])
+        self.archive_dir = archive_dir
+        store.connection.execute("""
+            CREATE TABLE IF NOT EXISTS partition_catalog (
+                table_name TEXT NOT NULL,
+                month TEXT NOT NULL,
+                storage TEXT NOT NULL CHECK (storage IN ('sqlite', 'archive')),
+                path TEXT,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (table_name, month)
+            )
+        """)
+        store.connection.execute("""
+            CREATE TABLE IF NOT EXISTS partition_summaries (
+                table_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                month TEXT NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                successful_count INTEGER NOT NULL DEFAULT 0,
+                amount_count INTEGER NOT NULL DEFAULT 0,
+                amount_sum REAL NOT NULL DEFAULT 0,
+                amount_sum_squares REAL NOT NULL DEFAULT 0,
+                dispute_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (table_name, user_id, month)
+            ) WITHOUT ROWID
+        """)
+
+    def partition_name(self, month):
+        return _partition_table(self.table, month)
+
+    def partitions(self, start=None, end=None):
+        """Catalog rows for months overlapping [start, end); open bounds include everything"""
+        sql = "SELECT month, storage, path, row_count FROM partition_catalog WHERE table_name = ?"
+        params = [self.table]
+        if start is not None:
+            sql += " AND month >= ?"
+            params.append(month_key(start))
+        if end is not None:
+            sql += " AND month <= ?"
+            params.append(month_key(end))
+        return self.store.query(sql + " ORDER BY month", params)
+
+    def _ensure_partition(self, month):
+        name = self.partition_name(month)
+        connection = self.store.connection
+        body = ',\n    '.join(_column_ddl(column, spec) for column, spec in self.columns.items())
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {name} (\n    {body}\n)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_user_id_created_at ON {name} (user_id, created_at)")
+
+        # Same aggregate triggers as the base table, retargeted at the partition
+        triggers = connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name LIKE 'trg_aggregates_%'",
+            (self.table,)
+        ).fetchall()
+        for trigger, sql in triggers:
+            # sqlite_master keeps the statement without IF NOT EXISTS
+            sql = re.sub(rf"^CREATE TRIGGER (IF NOT EXISTS )?{trigger}\b",
+                         f"CREATE TRIGGER IF NOT EXISTS {trigger}_{name}", sql, count=1)
+            sql = re.sub(rf"\bON {self.table}\b", f"ON {name}", sql, count=1)
+            connection.execute(sql)
+
+        connection.execute(
+            "INSERT INTO partition_catalog (table_name, month, storage) VALUES (?, ?, 'sqlite') "
+            "ON CONFLICT (table_name, month) DO NOTHING",
+            (self.table, month)
+        )
+        storage, = connection.execute(
+            "SELECT storage FROM partition_catalog WHERE table_name = ? AND month = ?", (self.table, month)
+        ).fetchone()
+        if storage != 'sqlite':
+            raise ValueError(f"{self.table} {month} is archived; archived months are read-only")
+        return name
+
+    # Writes
+
+    def insert_many(self, rows, batch_size=10_000):
+        """Insert row dicts, routed by created_at month; returns the number of rows inserted"""
+        now = datetime.now().isoformat(sep=' ', timespec='seconds')
+        by_month = {}
+        for row in rows:
+            unknown = set(row) - set(self.columns)
+            if unknown:
+                raise ValueError(f"Unknown columns for {self.table}: {sorted(unknown)}")
+            # Resolve defaults here so routing and the stored row agree
+            row = dict(row)
+            if row.get(self.primary_key) is None:
+                row[self.primary_key] = str(uuid.uuid4())
+            row['created_at'] = _timestamp(row['created_at']) if row.get('created_at') is not None else now
+            by_month.setdefault(month_key(row['created_at']), []).append(row)
+
+        inserted = 0
+        with self.store.transaction() as connection:
+            for month, month_rows in sorted(by_month.items()):
+                name = self._ensure_partition(month)
+                for start in range(0, len(month_rows), batch_size):
+                    inserted += self.store._insert_batch(name, self.columns, month_rows[start:start + batch_size])
+                connection.execute(
+                    "UPDATE partition_catalog SET row_count = row_count + ? WHERE table_name = ? AND month = ?",
+                    (len(month_rows), self.table, month)
+                )
+        return inserted
+
+    # Reads
+
+    def query(self, start=None, end=None, user_id=None, columns=None):
+        """
+        Rows with start <= created_at < end (optionally for one user), oldest month first
+        Only partitions overlapping the window are read: SQLite months through their
+        (user_id, created_at) index, archived months through Parquet row-group filters.
+        """
+        columns = list(columns or self.columns)
+        conditions, params = [], []
+        filters = []
+        if start is not None:
+            conditions.append("created_at >= ?")
+            params.append(_timestamp(start))
+            filters.append(('created_at', '>=', _timestamp(start)))
+        if end is not None:
+            conditions.append("created_at < ?")
+            params.append(_timestamp(end))
+            filters.append(('created_at', '<', _timestamp(end)))
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+            filters.append(('user_id', '=', user_id))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        rows = []
+        for partition in self.partitions(start, end):
+            if partition['storage'] == 'sqlite':
+                name = self.partition_name(partition['month'])
+                rows.extend(self.store.query(f"SELECT {', '.join(columns)} FROM {name}{where}", params))
+            else:
+                pq = _require_pyarrow()
+                rows.extend(pq.read_table(partition['path'], columns=columns, filters=filters or None).to_pylist())
+        return rows
+
+    # Compaction
+
+    def compact(self, before):
+        """
+        Archive every SQLite month older than before's month into Parquet and drop it
+        Rows are sorted by (user_id, created_at) so per-user reads hit few row groups.
+        Per-user summaries of each month are kept in partition_summaries so scorer
+        aggregates never re-read the archive. Returns the list of months archived.
+        """
+        pq = _require_pyarrow()
+        import pyarrow as pa
+        schema = pa.schema([(name, ARCHIVE_TYPES[column['sqlite_type']]) for name, column in self.columns.items()])
+        directory = os.path.join(self.archive_dir, self.table)
+        os.makedirs(directory, exist_ok=True)
+
+        summary = PARTITION_SUMMARY_COLUMNS[self.table]
+        archived = []
+        for partition in self.partitions():
+            month = partition['month']
+            if partition['storage'] != 'sqlite' or month >= month_key(before):
+                continue
+
+            name = self.partition_name(month)
+            rows = self.store.query(f"SELECT * FROM {name} ORDER BY user_id, created_at")
+            path = os.path.join(directory, f"{month}.parquet")
+            pq.write_table(pa.Table.from_pylist(rows, schema=schema), path, compression='zstd')
+
+            with self.store.transaction() as connection:
+                connection.execute(
+                    "UPDATE partition_catalog SET storage = 'archive', path = ?, row_count = ? "
+                    "WHERE table_name = ? AND month = ?",
+                    (path, len(rows), self.table, month)
+                )
+                connection.execute(
+                    f"INSERT INTO partition_summaries (table_name, user_id, month, {', '.join(summary)}) "
+                    f"SELECT ?, user_id, ?, {', '.join(summary.values())} FROM {name} GROUP BY user_id",
+                    (self.table, month)
+                )
+                connection.execute(f"DROP TABLE {name}")
+            archived.append(month)
+        return archived
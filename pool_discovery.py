@@ -0,0 +1,173 @@
+# Pool discovery index with keyset pagination for Sure Circle
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 10
+
+# Seats assumed for pools created without max_members
+UNLIMITED_SEATS = 2_147_483_647
+
+# pool_directory mirrors each pool with its active member count, kept current by
+# triggers on pools and pool_members; remaining_seats is a stored generated column
+# (UNLIMITED_SEATS-based for pools without max_members, reported to callers as None)
+POOL_DIRECTORY_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS pool_directory (
+    pool_id TEXT PRIMARY KEY REFERENCES pools(pool_id),
+    name TEXT,
+    category TEXT,
+    status TEXT,
+    trust_threshold INTEGER NOT NULL DEFAULT 0,
+    max_members INTEGER,
+    monthly_contribution REAL,
+    coverage_limit REAL,
+    member_count INTEGER NOT NULL DEFAULT 0,
+    remaining_seats INTEGER GENERATED ALWAYS AS (COALESCE(max_members, {UNLIMITED_SEATS}) - member_count) STORED,
+    created_at TEXT
+)""",
+    # Browse: keyset over (status, created_at) with pool_id as the tie-breaker
+    "CREATE INDEX IF NOT EXISTS idx_pool_directory_status_created_at ON pool_directory (status, created_at, pool_id)",
+    # Eligibility: only joinable pools are indexed, so every entry scanned is a result.
+    # remaining_seats is a filter only; it changes on every join, so it is kept out of
+    # the sort key to stop pools moving across a page cursor
+    "DROP INDEX IF EXISTS idx_pool_directory_open_category",
+    "DROP INDEX IF EXISTS idx_pool_directory_open",
+    """CREATE INDEX IF NOT EXISTS idx_pool_directory_eligible_category
+    ON pool_directory (category, trust_threshold, pool_id)
+    WHERE status = 'active' AND remaining_seats > 0""",
+    """CREATE INDEX IF NOT EXISTS idx_pool_directory_eligible
+    ON pool_directory (trust_threshold, pool_id)
+    WHERE status = 'active' AND remaining_seats > 0""",
+    """CREATE TRIGGER IF NOT EXISTS trg_pool_directory_insert AFTER INSERT ON pools
+BEGIN
+    INSERT INTO pool_directory (pool_id, name, category, status, trust_threshold, max_members,
+                                monthly_contribution, coverage_limit, created_at)
+    VALUES (NEW.pool_id, NEW.name, NEW.category, NEW.status, COALESCE(NEW.trust_threshold, 0), NEW.max_members,
+            NEW.monthly_contribution, NEW.coverage_limit, NEW.created_at);
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_pool_directory_update AFTER UPDATE ON pools
+BEGIN
+    UPDATE pool_directory SET
+        name = NEW.name, category = NEW.category, status = NEW.status,
+        trust_threshold = COALESCE(NEW.trust_threshold, 0), max_members = NEW.max_members,
+        monthly_contribution = NEW.monthly_contribution, coverage_limit = NEW.coverage_limit,
+        created_at = NEW.created_at
+    WHERE pool_id = NEW.pool_id;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_pool_directory_member AFTER INSERT ON pool_members
+WHEN NEW.status = 'active'
+BEGIN
+    UPDATE pool_directory SET member_count = member_count + 1 WHERE pool_id = NEW.pool_id;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_pool_directory_member_status AFTER UPDATE OF status ON pool_members
+BEGIN
+    UPDATE pool_directory
+    SET member_count = member_count + (NEW.status IS 'active') - (OLD.status IS 'active')
+    WHERE pool_id = NEW.pool_id;
+END"""
+]
+
+DIRECTORY_COLUMNS = ('pool_id', 'name', 'category', 'status', 'trust_threshold', 'max_members',
+                     'monthly_contribution', 'coverage_limit', 'member_count', 'remaining_seats', 'created_at')
+
+# Select list for result rows: unlimited pools report remaining_seats as None
+_SELECT_COLUMNS = ', '.join(
+    'CASE WHEN max_members IS NULL THEN NULL ELSE remaining_seats END AS remaining_seats'
+    if column == 'remaining_seats' else column
+    for column in DIRECTORY_COLUMNS
+)
+
+def encode_cursor(values):
+    """Opaque, URL-safe page cursor for the sort key of the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+
+class PoolDiscoveryIndex:
+    """
+    Pool listing and eligibility search with keyset (cursor) pagination
+
+    Replaces skip/limit paging: each page seeks the index just past the previous
+    page's last key, so page 1000 costs the same as page 1. list_pools pages by
+    (status, created_at) newest first; eligible_pools finds active pools with free
+    seats whose trust_threshold the member's score meets, from a partial index that
+    contains only joinable pools, paging on the stable (trust_threshold, pool_id) key.
+    remaining_seats is None for pools without max_members.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        for statement in POOL_DIRECTORY_DDL:
+            store.connection.execute(statement)
+
+    def rebuild(self):
+        """Repopulate pool_directory from pools and pool_members, e.g. for an existing database"""
+        with self.store.transaction() as connection:
+            connection.execute("DELETE FROM pool_directory")
+            connection.execute("""
+                INSERT INTO pool_directory (pool_id, name, category, status, trust_threshold, max_members,
+                                            monthly_contribution, coverage_limit, member_count, created_at)
+                SELECT p.pool_id, p.name, p.category, p.status, COALESCE(p.trust_threshold, 0), p.max_members,
+                       p.monthly_contribution, p.coverage_limit,
+                       (SELECT COUNT(*) FROM pool_members m WHERE m.pool_id = p.pool_id AND m.status = 'active'),
+                       p.created_at
+                FROM pools p
+            """)
+
+    def _page(self, sql, params, limit, key_columns):
+        rows = self.store.query(sql, (*params, limit + 1))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][column] for column in key_columns])
+        return {'pools': rows, 'next_cursor': next_cursor}
+
+    def list_pools(self, status='active', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """One page of pools with the given status, newest first; pass next_cursor to continue"""
+        columns = _SELECT_COLUMNS
+        if cursor is None:
+            return self._page(
+                f"SELECT {columns} FROM pool_directory WHERE status = ? "
+                f"ORDER BY created_at DESC, pool_id DESC LIMIT ?",
+                (status,), limit, ('created_at', 'pool_id')
+            )
+        created_at, pool_id = decode_cursor(cursor)
+        return self._page(
+            f"SELECT {columns} FROM pool_directory WHERE status = ? AND (created_at, pool_id) < (?, ?) "
+            f"ORDER BY created_at DESC, pool_id DESC LIMIT ?",
+            (status, created_at, pool_id), limit, ('created_at', 'pool_id')
+        )
+
+    def eligible_pools(self, trust_score, category=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        One page of active pools with free seats and trust_threshold <= trust_score,
+        optionally in one category; most selective pools (highest threshold) first
+        """
+        columns = _SELECT_COLUMNS
+        conditions = ["status = 'active'", "remaining_seats > 0"]
+        params = []
+        if category is not None:
+            conditions.insert(0, "category = ?")
+            params.append(category)
+        key = decode_cursor(cursor) if cursor is not None else None
+        if key is not None and len(key) != 2:
+            raise ValueError(f"Invalid page cursor: {cursor!r}")
+        if key is not None and key[0] <= trust_score:
+            # The cursor key already sits at or below trust_score; a second bound would
+            # stop SQLite seeking on the full (trust_threshold, pool_id) key
+            conditions.append("(trust_threshold, pool_id) < (?, ?)")
+            params.extend(key)
+        else:
+            # First page, or a cursor from a higher score: restart at the member's threshold
+            conditions.append("trust_threshold <= ?")
+            params.append(int(trust_score))
+        index = 'idx_pool_directory_eligible_category' if category is not None else 'idx_pool_directory_eligible'
+
+        return self._page(
+            f"SELECT {columns} FROM pool_directory INDEXED BY {index} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY trust_threshold DESC, pool_id DESC LIMIT ?",
+            params, limit, ('trust_threshold', 'pool_id')
+        )
@@ -0,0 +1,190 @@
+# Compact user-profile representations for Sure Circle trust scoring
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from script_1 import FEATURE_INPUTS
+
+# One packed row per member: about 59 bytes instead of a 1-2 KB Python dict.
+# Counters are narrow integers and measurements float32, so values read back
+# from the table can differ from the float64 originals in the last few bits.
+# trusted_connections is float32 because TrustGraph supplies fractional counts.
+# Values outside an integer field's range are rejected rather than wrapped.
+PROFILE_DTYPE = np.dtype([
+    ('user_id', np.int64),
+    ('months_active', np.float32),
+    ('total_contributions', np.int16),
+    ('on_time_contributions', np.int16),
+    ('contribution_months', np.int16),
+    ('payment_variance', np.float32),
+    ('claims_submitted', np.int16),
+    ('approved_claims', np.int16),
+    ('avg_claim_amount', np.float32),
+    ('coverage_limit', np.float32),
+    ('votes_participated', np.int32),
+    ('voting_opportunities', np.int32),
+    ('successful_referrals', np.int16),
+    ('kyc_verified', np.bool_),
+    ('document_verification_score', np.float32),
+    ('avg_peer_rating', np.float32),
+    ('trusted_connections', np.float32),
+    ('disputes_raised', np.int16)
+])
+
+@dataclass(slots=True)
+class UserProfile:
+    """Typed single-user record with the inputs create_features reads"""
+    user_id: int = 0
+    months_active: float = FEATURE_INPUTS['months_active']
+    total_contributions: int = FEATURE_INPUTS['total_contributions']
+    on_time_contributions: int = FEATURE_INPUTS['on_time_contributions']
+    contribution_months: int = FEATURE_INPUTS['contribution_months']
+    payment_variance: float = FEATURE_INPUTS['payment_variance']
+    claims_submitted: int = FEATURE_INPUTS['claims_submitted']
+    approved_claims: int = FEATURE_INPUTS['approved_claims']
+    avg_claim_amount: float = FEATURE_INPUTS['avg_claim_amount']
+    coverage_limit: float = FEATURE_INPUTS['coverage_limit']
+    votes_participated: int = FEATURE_INPUTS['votes_participated']
+    voting_opportunities: int = FEATURE_INPUTS['voting_opportunities']
+    successful_referrals: int = FEATURE_INPUTS['successful_referrals']
+    kyc_verified: bool = FEATURE_INPUTS['kyc_verified']
+    document_verification_score: float = FEATURE_INPUTS['document_verification_score']
+    avg_peer_rating: float = FEATURE_INPUTS['avg_peer_rating']
+    trusted_connections: float = FEATURE_INPUTS['trusted_connections']
+    disputes_raised: int = FEATURE_INPUTS['disputes_raised']
+
+    # Mapping-style access so create_features and create_features_batch accept a profile as-is
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in PROFILE_DTYPE.names
+
+    @classmethod
+    def from_dict(cls, user_data):
+        """Build a profile from a user dict, ignoring keys the scorer does not read"""
+        return cls(**{f.name: user_data[f.name] for f in fields(cls) if f.name in user_data})
+
+def _check_range(name, values):
+    """Raise ValueError if values do not fit PROFILE_DTYPE's integer field name"""
+    dtype = PROFILE_DTYPE[name]
+    if dtype.kind != 'i':
+        return
+    values = np.asarray(values)
+    if values.size == 0 or values.dtype == np.bool_:
+        return
+    info = np.iinfo(dtype)
+    if values.dtype.kind == 'f' and not np.isfinite(values).all():
+        raise ValueError(f"{name} must be finite to store as {dtype}")
+    low, high = values.min(), values.max()
+    if low < info.min or high > info.max:
+        raise ValueError(f"{name} values [{low}, {high}] do not fit {dtype} [{info.min}, {info.max}]")
+
+class UserProfileTable:
+    """
+    Columnar container of user profiles backed by one PROFILE_DTYPE structured array
+    Behaves like a dict of columns, so the scorer's batch APIs accept it directly
+    """
+
+    def __init__(self, data):
+        if data.dtype != PROFILE_DTYPE:
+            raise ValueError("UserProfileTable requires a PROFILE_DTYPE array")
+        self.data = data
+
+    @classmethod
+    def empty(cls, n_rows):
+        """Table of n_rows profiles with create_features defaults"""
+        data = np.zeros(n_rows, dtype=PROFILE_DTYPE)
+        for name, default in FEATURE_INPUTS.items():
+            data[name] = default
+        return cls(data)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Pack a dict of arrays (e.g. generate_synthetic_columns output) into a table"""
+        n_rows = len(next(iter(columns.values())))
+        table = cls.empty(n_rows)
+        for name in PROFILE_DTYPE.names:
+            if name in columns:
+                _check_range(name, columns[name])
+                table.data[name] = columns[name]
+        return table
+
+    @classmethod
+    def from_records(cls, records, user_ids=None):
+        """
+        Pack user dicts or UserProfile objects into a table
+        user_ids overrides the records' own ids, e.g. for string ids like 'user_42'
+        """
+        table = cls.empty(len(records))
+        for name in PROFILE_DTYPE.names[1:]:
+            default = FEATURE_INPUTS[name]
+            values = [record.get(name, default) for record in records]
+            _check_range(name, values)
+            table.data[name] = values
+
+        if user_ids is None:
+            user_ids = [record.get('user_id', i) for i, record in enumerate(records)]
+            if not all(isinstance(uid, (int, np.integer)) for uid in user_ids):
+                raise ValueError("UserProfileTable needs integer user ids; pass user_ids explicitly")
+        _check_range('user_id', user_ids)
+        table.data['user_id'] = user_ids
+        return table
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a table saved with save(); memory-mapped by default"""
+        return cls(np.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path):
+        np.save(path, self.data)
+        return path
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in PROFILE_DTYPE.names
+
+    def __getitem__(self, key):
+        """Column view by field name, or a sub-table for a slice or index array"""
+        if isinstance(key, str):
+            return self.data[key]
+        return UserProfileTable(self.data[key])
+
+    def profile(self, i):
+        """Single row as a UserProfile"""
+        row = self.data[i]
+        return UserProfile(**{name: row[name].item() for name in PROFILE_DTYPE.names})
+
+    def iter_chunks(self, chunk_size):
+        """Yield consecutive sub-tables of at most chunk_size rows"""
+        for start in range(0, len(self.data), chunk_size):
+            yield self[start:start + chunk_size]
+
+def score_profile_table(scorer, table, chunk_size=65_536):
+    """
+    Rescore a UserProfileTable chunk by chunk into compact result columns
+    Peak memory is the table plus one chunk's feature matrix, not N x 14 floats
+    """
+    n_rows = len(table)
+    trust_score = np.empty(n_rows, dtype=np.int16)
+    confidence = np.empty(n_rows, dtype=np.float32)
+
+    for start, chunk in zip(range(0, n_rows, chunk_size), table.iter_chunks(chunk_size)):
+        results = scorer.predict_trust_scores(chunk, top_k=0)
+        trust_score[start:start + len(chunk)] = results['trust_score']
+        confidence[start:start + len(chunk)] = results['prediction_confidence']
+
+    return {
+        'user_id': table['user_id'],
+        'trust_score': trust_score,
+        'score_band': scorer.score_band_lookup(trust_score),
+        'prediction_confidence': confidence
+    }
@@ -0,0 +1,141 @@
+# Feature-vector and score cache in front of the Sure Circle trust scorer
+import threading
+import time
+from collections import OrderedDict
+
+from script_1 import FEATURE_INPUTS
+
+def input_fingerprint(user_data):
+    """Exact fingerprint of the inputs create_features reads, with its defaults applied"""
+    return tuple(user_data.get(key, default) for key, default in FEATURE_INPUTS.items())
+
+def _copy_result(result):
+    """Caller-owned copy of a cached result, so edits never reach the cache"""
+    return dict(result, factors=[dict(factor) for factor in result.get('factors', [])])
+
+class _LRUCache:
+    """Size-bounded LRU map of user_id -> (fingerprint, value, expires_at) with TTL"""
+
+    def __init__(self, max_entries, ttl_seconds, clock):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, user_id, fingerprint):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        cached_fingerprint, value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[user_id]
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return None
+        if cached_fingerprint != fingerprint:
+            # Inputs changed since caching; the stale entry is replaced on put
+            self.stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.stats['hits'] += 1
+        return value
+
+    def put(self, user_id, fingerprint, value):
+        self._entries[user_id] = (fingerprint, value, self.clock() + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, user_id):
+        if self._entries.pop(user_id, None) is not None:
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        self.stats['invalidations'] += len(self._entries)
+        self._entries.clear()
+
+    def metrics(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(self.stats, size=len(self._entries), hit_rate=self.stats['hits'] / lookups if lookups else 0.0)
+
+class CachedTrustScorer:
+    """
+    Memoizes feature vectors and score results per user_id
+    Entries are keyed by user_id plus an exact fingerprint of the scorer inputs,
+    bounded by max_entries with LRU eviction, expire after ttl_seconds, and are
+    dropped explicitly when an activity event for the user arrives.
+    Results are returned as copies; cached feature vectors are read-only arrays.
+    """
+
+    def __init__(self, scorer, max_entries=100_000, ttl_seconds=3600, clock=time.monotonic):
+        self.scorer = scorer
+        self._features = _LRUCache(max_entries, ttl_seconds, clock)
+        self._results = _LRUCache(max_entries, ttl_seconds, clock)
+        self._lock = threading.Lock()
+
+    def create_features(self, user_id, user_data):
+        """Cached equivalent of scorer.create_features"""
+        fingerprint = input_fingerprint(user_data)
+        with self._lock:
+            features = self._features.get(user_id, fingerprint)
+        if features is None:
+            features = self.scorer.create_features_batch(user_data)[0]
+            features.flags.writeable = False
+            with self._lock:
+                self._features.put(user_id, fingerprint, features)
+        return features
+
+    def predict_trust_score(self, user_id, user_data):
+        """Cached equivalent of scorer.predict_trust_score"""
+        fingerprint = input_fingerprint(user_data)
+        with self._lock:
+            result = self._results.get(user_id, fingerprint)
+        if result is None:
+            result = self.scorer.predict_trust_score(user_data)
+            with self._lock:
+                self._results.put(user_id, fingerprint, result)
+        return _copy_result(result)
+
+    def predict_trust_scores(self, user_ids, users):
+        """
+        Cached scoring for a batch of users; returns one result dict per user
+        Only the cache misses go through the scorer, in a single bulk call
+        """
+        fingerprints = [input_fingerprint(user) for user in users]
+        with self._lock:
+            results = [self._results.get(uid, fp) for uid, fp in zip(user_ids, fingerprints)]
+
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            bulk = self.scorer.split_bulk_results(self.scorer.predict_trust_scores([users[i] for i in misses]))
+            with self._lock:
+                for i, result in zip(misses, bulk):
+                    results[i] = result
+                    self._results.put(user_ids[i], fingerprints[i], result)
+        return [_copy_result(result) for result in results]
+
+    def invalidate(self, user_id):
+        """Drop every cached entry for a user"""
+        with self._lock:
+            self._features.invalidate(user_id)
+            self._results.invalidate(user_id)
+
+    def invalidate_all(self):
+        """Drop all cached entries, e.g. after loading a new model artifact"""
+        with self._lock:
+            self._features.clear()
+            self._results.clear()
+
+    def on_activity_event(self, event):
+        """Invalidate on an activity event dict (same shape as IncrementalFeatureStore.apply_event)"""
+        self.invalidate(event['user_id'])
+
+    def metrics(self):
+        """Hit/miss/eviction counters for the feature and result caches"""
+        with self._lock:
+            return {'features': self._features.metrics(), 'results': self._results.metrics()}
@@ -0,0 +1,367 @@
+# Asyncio trust-scoring microservice with request micro-batching
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from script_1 import FEATURE_INPUTS, MODEL_ARTIFACT_PATH, SureCircleTrustScorer
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+                503: 'Service Unavailable'}
+
+MAX_BODY_BYTES = 1 * 2**20
+
+class ServiceOverloaded(Exception):
+    """Raised when the request queue is full; surfaced to clients as HTTP 503"""
+
+class _HTTPError(Exception):
+    """Malformed request framing; answered with status, then the connection is closed"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+async def _read_request(reader, request_line):
+    """Parse the request line and headers, then read a Content-Length or chunked body"""
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise _HTTPError(400, 'Malformed request line')
+    method, path, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, separator, value = line.decode('latin-1').partition(':')
+        if not separator:
+            raise _HTTPError(400, 'Malformed header line')
+        headers[name.strip().lower()] = value.strip()
+
+    encoding = headers.get('transfer-encoding', '').lower()
+    if encoding:
+        if encoding != 'chunked':
+            raise _HTTPError(400, f'Unsupported Transfer-Encoding: {encoding}')
+        return method, path, headers, await _read_chunked(reader)
+
+    if 'content-length' not in headers:
+        if method in ('POST', 'PUT', 'PATCH'):
+            raise _HTTPError(411, 'Content-Length or chunked Transfer-Encoding required')
+        return method, path, headers, b''
+    try:
+        length = int(headers['content-length'])
+    except ValueError:
+        raise _HTTPError(400, 'Invalid Content-Length') from None
+    if length < 0:
+        raise _HTTPError(400, 'Invalid Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise _HTTPError(413, 'Body too large')
+    return method, path, headers, await reader.readexactly(length) if length else b''
+
+async def _read_chunked(reader):
+    """Body of a Transfer-Encoding: chunked request, capped at MAX_BODY_BYTES"""
+    body = bytearray()
+    while True:
+        size_line = await reader.readline()
+        try:
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            raise _HTTPError(400, 'Invalid chunk size') from None
+        if size == 0:
+            break
+        if len(body) + size > MAX_BODY_BYTES:
+            raise _HTTPError(413, 'Body too large')
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+
+    # Skip any trailer headers up to the terminating blank line
+    while await reader.readline() not in (b'\r\n', b'\n', b''):
+        pass
+    return bytes(body)
+
+def validate_user(user_data):
+    """
+    Coerce a request body's feature inputs to the types create_features expects
+    Numeric inputs accept numbers or numeric strings, coverage_limit must be positive
+    and kyc_verified accepts booleans or 0/1. Raises ValueError naming the first bad
+    field, so one malformed request is rejected on its own instead of failing the
+    micro-batch it would join.
+    """
+    cleaned = dict(user_data)
+    for key in FEATURE_INPUTS.keys() & user_data.keys():
+        value = user_data[key]
+        if key == 'kyc_verified':
+            if value is None or isinstance(value, bool) or value in (0, 1):
+                cleaned[key] = bool(value)
+                continue
+            raise ValueError(f"{key} must be a boolean")
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{key} must be a number")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{key} must be a number") from None
+        if not math.isfinite(number):
+            raise ValueError(f"{key} must be finite")
+        if key == 'coverage_limit' and number <= 0:
+            raise ValueError("coverage_limit must be positive")
+        cleaned[key] = number
+    return cleaned
+
+class MicroBatcher:
+    """
+    Collects concurrent single-user score requests into micro-batches
+
+    A batch is flushed when it reaches max_batch_size or when its oldest request
+    has waited max_wait_ms. Batches run one at a time in a worker thread through
+    predict_batch(list of user dicts) -> list of results, so the event loop keeps
+    accepting requests. If a batch fails, its users are rescored one by one so only
+    the requests that actually fail see the exception. When max_queue requests are
+    already waiting, submit raises ServiceOverloaded instead of letting latency grow
+    without bound.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=256, max_wait_ms=5.0, max_queue=10_000):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self.latencies = deque(maxlen=10_000)
+        self.batch_sizes = deque(maxlen=1_000)
+        self.stats = {'requests': 0, 'rejected': 0, 'errors': 0, 'batches': 0}
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, user_data):
+        """Queue one user for scoring and wait for its result"""
+        if self._queue.qsize() >= self.max_queue:
+            self.stats['rejected'] += 1
+            raise ServiceOverloaded(f"{self._queue.qsize()} requests already queued")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((user_data, future, time.perf_counter()))
+        self.stats['requests'] += 1
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = batch[0][2] + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            users = [user for user, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.predict_batch, users)
+            except Exception as exc:
+                if len(batch) == 1:
+                    self._fail(batch[0][1], exc)
+                    continue
+                results = await loop.run_in_executor(None, self._predict_each, users)
+
+            now = time.perf_counter()
+            for (_, future, queued_at), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self._fail(future, result)
+                    continue
+                if not future.done():
+                    future.set_result(result)
+                self.latencies.append(now - queued_at)
+            self.stats['batches'] += 1
+            self.batch_sizes.append(len(batch))
+
+    def _predict_each(self, users):
+        """Fallback for a failed batch: score users singly, returning exceptions in place"""
+        results = []
+        for user in users:
+            try:
+                results.append(self.predict_batch([user])[0])
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def _fail(self, future, exc):
+        self.stats['errors'] += 1
+        if not future.done():
+            future.set_exception(exc)
+
+    def metrics(self):
+        """Request counters, queue depth, batch sizes and p50/p99 latency"""
+        latencies = np.array(self.latencies) * 1000
+        return dict(
+            self.stats,
+            queue_depth=self._queue.qsize(),
+            mean_batch_size=float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            p50_ms=float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            p99_ms=float(np.percentile(latencies, 99)) if len(latencies) else 0.0
+        )
+
+class ScoringService:
+    """
+    Trust scoring behind a MicroBatcher, with a minimal HTTP/1.1 front end
+
+    Endpoints:
+      POST /score    body: one user dict  -> predict_trust_score-shaped result
+      GET  /health   model and queue status
+      GET  /metrics  batching and latency metrics
+    The same handler serves TCP and Unix-socket transports, so the Node backend
+    can keep a persistent local connection. Bodies may use Content-Length or chunked
+    transfer encoding (Node's default); malformed framing gets a 4xx before closing.
+    """
+
+    def __init__(self, scorer, compiled=None, max_batch_size=256, max_wait_ms=5.0, max_queue=10_000):
+        self.scorer = scorer
+        self.compiled = compiled
+        self.started_at = time.time()
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_wait_ms, max_queue)
+
+    def _predict_batch(self, users):
+        if self.compiled is not None:
+            # Scores-only fast path: compiled forest, no factor attribution
+            results = self.compiled.predict_trust_scores(self.scorer.create_features_batch(users))
+            return [
+                {
+                    'trust_score': int(score),
+                    'score_band': str(band),
+                    'factors': [],
+                    'prediction_confidence': float(confidence)
+                }
+                for score, band, confidence in zip(
+                    results['trust_score'], results['score_band'], results['prediction_confidence']
+                )
+            ]
+        return self.scorer.split_bulk_results(self.scorer.predict_trust_scores(users))
+
+    async def handle_request(self, method, path, body):
+        """Route one request; returns (status, JSON-serialisable payload)"""
+        if path == '/health':
+            return 200, {
+                'status': 'ok',
+                'model_loaded': self.scorer.model is not None,
+                'engine': 'compiled' if self.compiled is not None else 'sklearn',
+                'queue_depth': self.batcher.metrics()['queue_depth'],
+                'uptime_seconds': time.time() - self.started_at
+            }
+        if path == '/metrics':
+            return 200, self.batcher.metrics()
+        if path != '/score':
+            return 404, {'error': 'Not found'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+
+        if not body:
+            return 400, {'error': 'Empty body; send one user as a JSON object'}
+        try:
+            user_data = json.loads(body)
+        except ValueError:
+            return 400, {'error': 'Invalid JSON body'}
+        if not isinstance(user_data, dict):
+            return 400, {'error': 'Body must be a JSON object'}
+        try:
+            user_data = validate_user(user_data)
+        except ValueError as exc:
+            return 400, {'error': 'Invalid user data', 'detail': str(exc)}
+
+        try:
+            return 200, await self.batcher.submit(user_data)
+        except ServiceOverloaded as exc:
+            return 503, {'error': 'Overloaded', 'detail': str(exc)}
+        except Exception as exc:
+            return 500, {'error': 'Scoring failed', 'detail': str(exc)}
+
+    async def _handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection, with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, headers, body = await _read_request(reader, request_line)
+                except _HTTPError as exc:
+                    await self._respond(writer, exc.status, {'error': str(exc)}, keep_alive=False)
+                    break
+
+                status, payload = await self.handle_request(method, path.split('?', 1)[0], body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def start(self, transport='http', host='127.0.0.1', port=8765, socket_path=None):
+        """Start the batcher and a TCP ('http') or Unix-socket ('unix') server"""
+        self.batcher.start()
+        if transport == 'http':
+            return await asyncio.start_server(self._handle_connection, host, port)
+        if transport == 'unix':
+            return await asyncio.start_unix_server(self._handle_connection, socket_path)
+        raise ValueError(f"Unknown transport: {transport}")
+
+async def _serve(args):
+    scorer = SureCircleTrustScorer.load(args.model)
+    compiled = None
+    if args.compiled:
+        from forest_engine import CompiledForest
+        compiled = CompiledForest.load(args.compiled)
+
+    service = ScoringService(scorer, compiled, args.max_batch_size, args.max_wait_ms, args.max_queue)
+    server = await service.start(args.transport, args.host, args.port, args.socket_path)
+    where = args.socket_path if args.transport == 'unix' else f"{args.host}:{args.port}"
+    print(f"🚀 Trust scoring service listening on {where} ({args.transport})")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve trust scores over HTTP or a Unix socket")
+    parser.add_argument('--model', default=MODEL_ARTIFACT_PATH)
+    parser.add_argument('--compiled', help="CompiledForest .npz for scores-only serving")
+    parser.add_argument('--transport', choices=['http', 'unix'], default='http')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket-path', default='/tmp/surecircle-scoring.sock')
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--max-queue', type=int, default=10_000)
+    asyncio.run(_serve(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
@@ -96,7 +96,8 @@ database_schema = {
     }
 }
 
-print("✅ Database Schema Created")
-print(f"Total Tables: {len(database_schema)}")
-for table, fields in database_schema.items():
-    print(f"  📊 {table}: {len(fields)} fields")
\ No newline at end of file
+if __name__ == "__main__":
+    print("✅ Database Schema Created")
+    print(f"Total Tables: {len(database_schema)}")
+    for table, fields in database_schema.items():
+        print(f"  📊 {table}: {len(fields)} fields")
\ No newline at end of file
@@ -1,16 +1,86 @@
 # Create ML Trust Scoring Model for Sure Circle
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import joblib
 import json
+import os
+
+from attribution import ForestAttribution
+from forest_engine import CompiledForest
+
+# Feature vector layout shared by the scalar and batch extraction paths
+FEATURE_NAMES = [
+    'payment_consistency', 'contribution_frequency', 'payment_amount_stability',
+    'claim_frequency', 'claim_legitimacy', 'claim_amount_reasonableness',
+    'voting_participation', 'referral_activity', 'group_tenure',
+    'kyc_completeness', 'document_quality',
+    'peer_ratings', 'network_trust', 'dispute_history'
+]
+
+# Raw user inputs read by create_features, with the defaults it falls back to
+FEATURE_INPUTS = {
+    'on_time_contributions': 0,
+    'total_contributions': 1,
+    'contribution_months': 0,
+    'payment_variance': 0.5,
+    'claims_submitted': 0,
+    'months_active': 0,
+    'approved_claims': 0,
+    'avg_claim_amount': 0,
+    'coverage_limit': 1,
+    'votes_participated': 0,
+    'voting_opportunities': 1,
+    'successful_referrals': 0,
+    'kyc_verified': False,
+    'document_verification_score': 0.5,
+    'avg_peer_rating': 3.0,
+    'trusted_connections': 0,
+    'disputes_raised': 0
+}
+
+# Feature schema fingerprint stored in model artifacts; any change to the
+# feature layout or input defaults invalidates previously saved models
+FEATURE_SCHEMA_HASH = hashlib.sha256(
+    json.dumps({'features': FEATURE_NAMES, 'inputs': FEATURE_INPUTS}, sort_keys=True).encode()
+).hexdigest()
+
+MODEL_ARTIFACT_VERSION = 1
+MODEL_ARTIFACT_PATH = 'trust_scorer_model.joblib'
+
+# Training sets at least this large use histogram gradient boosting with early stopping
+HIST_GRADIENT_BOOSTING_MIN_SAMPLES = 10_000
+
+# Per-tree disagreement (in score points) at which prediction confidence reaches zero
+CONFIDENCE_SPREAD_SCALE = 100.0
+
+def _input_columns(data):
+    """Normalise user input into a dict of equal-length NumPy columns"""
+    if isinstance(data, (list, tuple)):
+        # Rows of user dicts: honour per-row defaults exactly like create_features
+        return {
+            key: np.asarray([user.get(key, default) for user in data])
+            for key, default in FEATURE_INPUTS.items()
+        }
+    
+    # DataFrame, dict of arrays, or a single user dict of scalars
+    columns = {key: np.atleast_1d(np.asarray(data[key])) for key in FEATURE_INPUTS if key in data}
+    n_rows = len(next(iter(columns.values()))) if columns else 1
+    for key, default in FEATURE_INPUTS.items():
+        if key not in columns:
+            columns[key] = np.full(n_rows, default)
+    return columns
 
 # Define Trust Score Model Architecture
 class SureCircleTrustScorer:
     def __init__(self):
         self.model = None
+        self.boost_model = None
         self.scaler = StandardScaler()
         self.feature_importance = {}
         self.score_bands = {
@@ -20,6 +90,8 @@ class SureCircleTrustScorer:
             'Fair': (650, 699),
             'Poor': (300, 649)
         }
+        self._band_table_cache = None
+        self._attribution_cache = None
         
     def create_features(self, user_data):
         """
@@ -54,6 +126,48 @@ class SureCircleTrustScorer:
         
         return np.array(list(features.values()))
     
+    def create_features_batch(self, data):
+        """
+        Create the N x 14 feature matrix for many users at once
+        Accepts a pandas DataFrame, a dict of NumPy arrays or a list of user dicts
+        and produces exactly the same values as create_features row by row; like
+        create_features it raises ZeroDivisionError when a coverage_limit is 0
+        """
+        cols = {key: col.astype(np.float64) if key != 'kyc_verified' else col
+                for key, col in _input_columns(data).items()}
+        n_rows = len(cols['months_active'])
+        X = np.empty((n_rows, len(FEATURE_NAMES)), dtype=np.float64)
+        
+        # 1. Historical Payment Behavior
+        X[:, 0] = cols['on_time_contributions'] / np.maximum(cols['total_contributions'], 1)
+        X[:, 1] = cols['contribution_months']
+        X[:, 2] = 1 - cols['payment_variance']
+        
+        # 2. Claims Behavior
+        X[:, 3] = cols['claims_submitted'] / np.maximum(cols['months_active'], 1)
+        X[:, 4] = cols['approved_claims'] / np.maximum(cols['claims_submitted'], 1)
+        # create_features divides by coverage_limit unguarded; fail the same way
+        # rather than letting a NaN feature reach the forest
+        if not cols['coverage_limit'].all():
+            raise ZeroDivisionError("coverage_limit must be non-zero")
+        X[:, 5] = 1 - np.minimum(cols['avg_claim_amount'] / cols['coverage_limit'], 1)
+        
+        # 3. Community Participation
+        X[:, 6] = cols['votes_participated'] / np.maximum(cols['voting_opportunities'], 1)
+        X[:, 7] = np.minimum(cols['successful_referrals'] / 10, 1)
+        X[:, 8] = np.minimum(cols['months_active'] / 24, 1)
+        
+        # 4. Verification Status
+        X[:, 9] = cols['kyc_verified'].astype(bool)
+        X[:, 10] = cols['document_verification_score']
+        
+        # 5. Social Factors
+        X[:, 11] = cols['avg_peer_rating'] / 5.0
+        X[:, 12] = cols['trusted_connections'] / 20
+        X[:, 13] = 1 - np.minimum(cols['disputes_raised'] / 5, 1)
+        
+        return X
+    
     def generate_synthetic_data(self, n_samples=1000):
         """Generate synthetic training data for the model"""
         np.random.seed(42)
@@ -105,19 +219,129 @@ class SureCircleTrustScorer:
         
         return data
     
-    def train_model(self, training_data):
-        """Train the trust scoring model"""
-        # Prepare features and targets
-        X = []
-        y = []
+    def generate_synthetic_columns(self, n_samples=1000, seed=42, start_id=0):
+        """
+        Vectorized version of generate_synthetic_data returning a dict of NumPy columns
+        Same distributions and trust-score formula; user_id is an integer index
+        """
+        rng = np.random.default_rng(seed)
+        n = n_samples
+        
+        # Generate realistic user behavior patterns
+        months_active = rng.exponential(12, n)
+        total_contributions = np.maximum(1, (months_active * rng.uniform(0.8, 1.2, n)).astype(np.int64))
+        claims_submitted = rng.poisson(months_active / 12)
+        voting_opportunities = (months_active * 2).astype(np.int64)
+        
+        columns = {
+            'user_id': np.arange(start_id, start_id + n, dtype=np.int64),
+            'months_active': months_active,
+            'total_contributions': total_contributions,
+            'on_time_contributions': (total_contributions * rng.beta(5, 2, n)).astype(np.int64),
+            'payment_variance': rng.beta(1, 3, n),
+            'claims_submitted': claims_submitted,
+            'approved_claims': (claims_submitted * rng.beta(3, 1, n)).astype(np.int64),
+            'voting_opportunities': voting_opportunities,
+            'votes_participated': (voting_opportunities * rng.beta(2, 1, n)).astype(np.int64),
+            'successful_referrals': rng.poisson(1, n),
+            'kyc_verified': rng.random(n) < 0.8,
+            'document_verification_score': rng.beta(3, 1, n),
+            'avg_peer_rating': rng.normal(4.0, 0.5, n),
+            'trusted_connections': rng.poisson(8, n),
+            'disputes_raised': rng.poisson(0.5, n),
+            'coverage_limit': np.full(n, 50000, dtype=np.int64),
+            'avg_claim_amount': rng.exponential(15000, n)
+        }
         
-        for user in training_data:
-            features = self.create_features(user)
-            X.append(features)
-            y.append(user['trust_score'])
+        # Calculate target trust score (300-900 range)
+        base_score = 600
+        payment_factor = (columns['on_time_contributions'] / columns['total_contributions']) * 150
+        claim_factor = (1 - np.minimum(claims_submitted / 10, 1)) * 100
+        participation_factor = (columns['votes_participated'] / np.maximum(voting_opportunities, 1)) * 80
+        verification_factor = np.where(columns['kyc_verified'], 50, 0)
         
-        X = np.array(X)
-        y = np.array(y)
+        trust_score = np.clip(
+            base_score + payment_factor + claim_factor + participation_factor + verification_factor +
+            rng.normal(0, 20, n),
+            300, 900
+        )
+        columns['trust_score'] = trust_score.astype(np.int64)
+        
+        return columns
+    
+    def iter_synthetic_chunks(self, n_samples, chunk_size=1_000_000, seed=42):
+        """
+        Stream a synthetic population in column chunks of at most chunk_size rows
+        Each chunk gets its own child seed, so output is reproducible for a given chunk_size
+        """
+        n_chunks = -(-n_samples // chunk_size)
+        child_seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+        
+        for i, child_seed in enumerate(child_seeds):
+            start = i * chunk_size
+            yield self.generate_synthetic_columns(min(chunk_size, n_samples - start), child_seed, start)
+    
+    def write_synthetic_population(self, path, n_samples, chunk_size=1_000_000, seed=42, fmt='npy'):
+        """
+        Write a synthetic population to disk chunk by chunk
+        fmt='npy' writes one memory-mappable .npy file per column into the path directory;
+        fmt='parquet' writes a single Parquet file (requires pyarrow)
+        """
+        chunks = self.iter_synthetic_chunks(n_samples, chunk_size, seed)
+        
+        if fmt == 'npy':
+            os.makedirs(path, exist_ok=True)
+            outputs = None
+            for chunk in chunks:
+                if outputs is None:
+                    outputs = {
+                        name: np.lib.format.open_memmap(
+                            os.path.join(path, f'{name}.npy'), mode='w+', dtype=col.dtype, shape=(n_samples,)
+                        )
+                        for name, col in chunk.items()
+                    }
+                start = chunk['user_id'][0]
+                for name, col in chunk.items():
+                    outputs[name][start:start + len(col)] = col
+            for out in (outputs or {}).values():
+                out.flush()
+        
+        elif fmt == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Writing Parquet requires pyarrow: pip install pyarrow")
+            
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.table(chunk)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        
+        else:
+            raise ValueError(f"Unsupported output format: {fmt}")
+        
+        return path
+    
+    def train_model(self, training_data, n_jobs=-1, max_samples=None):
+        """
+        Train the trust scoring model
+        The forest and the boosting model are fitted concurrently; large training sets use
+        histogram gradient boosting with early stopping. The RF+GB ensemble is kept for
+        serving when it beats the forest alone on the held-out split.
+        """
+        # Prepare features and targets
+        X = self.create_features_batch(training_data)
+        if isinstance(training_data, (list, tuple)):
+            y = np.array([user['trust_score'] for user in training_data])
+        else:
+            y = np.asarray(training_data['trust_score'])
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -127,159 +351,362 @@ class SureCircleTrustScorer:
         X_test_scaled = self.scaler.transform(X_test)
         
         # Train ensemble model
-        rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        gb_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
+        rf_model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs, max_samples=max_samples)
+        if len(X_train) >= HIST_GRADIENT_BOOSTING_MIN_SAMPLES:
+            gb_model = HistGradientBoostingRegressor(
+                max_iter=500, early_stopping=True, validation_fraction=0.1,
+                n_iter_no_change=10, random_state=42
+            )
+        else:
+            gb_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
         
-        rf_model.fit(X_train_scaled, y_train)
-        gb_model.fit(X_train_scaled, y_train)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            fits = [executor.submit(model.fit, X_train_scaled, y_train) for model in (rf_model, gb_model)]
+            for fit in fits:
+                fit.result()
         
         # Ensemble predictions
         rf_pred = rf_model.predict(X_test_scaled)
         gb_pred = gb_model.predict(X_test_scaled)
         ensemble_pred = (rf_pred + gb_pred) / 2
         
-        # Store the best model (Random Forest in this case)
+        # Serve the ensemble only if it beats the forest on its own
+        rf_mse = mean_squared_error(y_test, rf_pred)
+        mse = mean_squared_error(y_test, ensemble_pred)
         self.model = rf_model
+        self.boost_model = gb_model if mse < rf_mse else None
         
         # Calculate metrics
-        mse = mean_squared_error(y_test, ensemble_pred)
         r2 = r2_score(y_test, ensemble_pred)
         
         # Feature importance
-        feature_names = [
-            'payment_consistency', 'contribution_frequency', 'payment_amount_stability',
-            'claim_frequency', 'claim_legitimacy', 'claim_amount_reasonableness',
-            'voting_participation', 'referral_activity', 'group_tenure',
-            'kyc_completeness', 'document_quality',
-            'peer_ratings', 'network_trust', 'dispute_history'
-        ]
-        
-        self.feature_importance = dict(zip(feature_names, rf_model.feature_importances_))
+        self.feature_importance = dict(zip(FEATURE_NAMES, rf_model.feature_importances_))
         
         return {
             'mse': mse,
             'r2_score': r2,
+            'rf_mse': rf_mse,
+            'rf_r2_score': r2_score(y_test, rf_pred),
+            'serving_model': 'ensemble' if self.boost_model is not None else 'random_forest',
             'feature_importance': self.feature_importance
         }
     
+    def _forest_predict(self, features_scaled):
+        """
+        Run the forest once and return (mean prediction, confidence)
+        Confidence comes from the spread of the per-tree predictions; when the
+        ensemble is serving, the boosting prediction is averaged in
+        """
+        X = np.ascontiguousarray(features_scaled, dtype=np.float32)
+        
+        # Running sums keep memory at O(N) instead of stacking N x n_trees predictions
+        total = np.zeros(len(X))
+        total_sq = np.zeros(len(X))
+        for tree in self.model.estimators_:
+            pred = tree.predict(X, check_input=False)
+            total += pred
+            total_sq += pred * pred
+        
+        n_trees = len(self.model.estimators_)
+        raw_scores = total / n_trees
+        spread = np.sqrt(np.maximum(total_sq / n_trees - raw_scores * raw_scores, 0))
+        if self.boost_model is not None:
+            raw_scores = (raw_scores + self.boost_model.predict(features_scaled)) / 2
+        confidence = np.clip(1 - spread / CONFIDENCE_SPREAD_SCALE, 0.7, 0.95)
+        return raw_scores, confidence
+    
+    def save(self, path):
+        """
+        Save the trained model, scaler, importances and bands as one artifact
+        Stored uncompressed so load() can memory-map the plain NumPy arrays
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        
+        artifact = {
+            'version': MODEL_ARTIFACT_VERSION,
+            'feature_schema_hash': FEATURE_SCHEMA_HASH,
+            'feature_names': FEATURE_NAMES,
+            'model': self.model,
+            'boost_model': self.boost_model,
+            'scaler': self.scaler,
+            'feature_importance': self.feature_importance,
+            'score_bands': self.score_bands
+        }
+        joblib.dump(artifact, path, compress=0)
+        return path
+    
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load a scorer from an artifact written by save()
+        With mmap_mode='r' plain NumPy arrays (the scaler's) are memory-mapped, but
+        sklearn copies tree nodes into private memory on unpickling, so each load
+        holds its own forest. To share one forest across processes, load once in the
+        parent and fork afterwards, as rescore_sharded does.
+        """
+        artifact = joblib.load(path, mmap_mode=mmap_mode)
+        
+        if artifact.get('version') != MODEL_ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported model artifact version: {artifact.get('version')}")
+        if artifact.get('feature_schema_hash') != FEATURE_SCHEMA_HASH:
+            raise ValueError("Model artifact was trained on a different feature schema")
+        
+        scorer = cls()
+        scorer.model = artifact['model']
+        scorer.boost_model = artifact.get('boost_model')
+        scorer.scaler = artifact['scaler']
+        scorer.feature_importance = artifact['feature_importance']
+        scorer.score_bands = artifact['score_bands']
+        return scorer
+    
+    def export_compiled(self, path=None):
+        """
+        Compile the trained model, scaler and score bands into a CompiledForest
+        Saved to path (.npz) when given; serving it needs NumPy only
+        """
+        compiled = CompiledForest.from_scorer(self)
+        if path is not None:
+            compiled.save(path)
+        return compiled
+    
+    def _band_table(self):
+        """
+        Dense lookup table mapping every integer score 300-900 to a band index
+        Rebuilt only when score_bands changes; first matching band wins, like the original scan
+        """
+        key = tuple(self.score_bands.items())
+        if self._band_table_cache is None or self._band_table_cache[0] != key:
+            names = np.array(list(self.score_bands) + ['Poor'], dtype=object)
+            table = np.full(601, len(names) - 1, dtype=np.int8)
+            for i, (min_score, max_score) in reversed(list(enumerate(self.score_bands.values()))):
+                lo, hi = max(min_score, 300), min(max_score, 900)
+                if lo <= hi:
+                    table[lo - 300:hi - 300 + 1] = i
+            self._band_table_cache = (key, names, table)
+        return self._band_table_cache[1], self._band_table_cache[2]
+    
+    def score_band_lookup(self, trust_scores):
+        """Resolve score band names for a score or an array of scores in O(1) each"""
+        names, table = self._band_table()
+        index = np.clip(np.asarray(trust_scores, dtype=np.int64), 300, 900) - 300
+        return names[table[index]]
+    
+    def top_factors(self, contributions, k=5):
+        """
+        Column indices of the k largest contributions per row, in descending order
+        Uses a partition so only the selected k are sorted; ties, including those at
+        the k-th boundary, go to the lower feature index like a stable full sort
+        """
+        contributions = np.atleast_2d(contributions)
+        n_features = contributions.shape[1]
+        k = min(k, n_features)
+        
+        if k == 0:
+            return np.empty((len(contributions), 0), dtype=np.intp)
+        if k < n_features:
+            # k-th largest value per row; everything above it is in, and the
+            # remaining slots go to the lowest-indexed columns equal to it
+            kth = -np.partition(-contributions, k - 1, axis=1)[:, k - 1:k]
+            above = contributions > kth
+            tied = contributions == kth
+            slots = k - above.sum(axis=1, keepdims=True)
+            selected = above | (tied & (np.cumsum(tied, axis=1) <= slots))
+            top = np.nonzero(selected)[1].reshape(len(contributions), k)
+        else:
+            top = np.broadcast_to(np.arange(n_features), contributions.shape)
+        
+        top_values = np.take_along_axis(contributions, top, axis=1)
+        order = np.lexsort((top, -top_values), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+    
+    def _attribution_engine(self):
+        """Cached decision-path attribution structure for the current forest"""
+        if self._attribution_cache is None or self._attribution_cache.forest is not self.model:
+            self._attribution_cache = ForestAttribution(self.model, len(FEATURE_NAMES))
+        return self._attribution_cache
+    
+    def explain_trust_scores(self, data):
+        """
+        Per-user factor attribution in score points for a batch of users
+        bias + contributions.sum(axis=1) equals the forest's raw prediction for each user
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        
+        features_scaled = self.scaler.transform(self.create_features_batch(data))
+        bias, contributions = self._attribution_engine().explain(features_scaled)
+        return {
+            'bias': bias,
+            'contributions': contributions,
+            'feature_names': FEATURE_NAMES
+        }
+    
     def predict_trust_score(self, user_data):
         """Predict trust score for a user"""
         if self.model is None:
             raise ValueError("Model not trained yet")
         
-        features = self.create_features(user_data).reshape(1, -1)
+        features = self.create_features_batch(user_data)
         features_scaled = self.scaler.transform(features)
         
-        raw_score = self.model.predict(features_scaled)[0]
+        raw_scores, confidence = self._forest_predict(features_scaled)
+        raw_score = raw_scores[0]
         
         # Ensure score is within valid range
         trust_score = max(300, min(900, int(raw_score)))
         
         # Get score band
-        score_band = 'Poor'
-        for band, (min_score, max_score) in self.score_bands.items():
-            if min_score <= trust_score <= max_score:
-                score_band = band
-                break
+        score_band = self.score_band_lookup(trust_score)
         
         # Get top contributing factors
         feature_names = list(self.feature_importance.keys())
-        feature_values = self.create_features(user_data)
-        
-        factor_contributions = []
-        for i, (name, importance) in enumerate(self.feature_importance.items()):
-            contribution = feature_values[i] * importance * 100
-            factor_contributions.append({
-                'factor': name,
-                'contribution': contribution,
-                'value': feature_values[i]
-            })
+        _, contributions = self._attribution_engine().explain(features_scaled)
         
-        factor_contributions.sort(key=lambda x: x['contribution'], reverse=True)
+        factor_contributions = [
+            {
+                'factor': feature_names[i],
+                'contribution': contributions[0, i],
+                'value': features[0, i]
+            }
+            for i in self.top_factors(contributions, 5)[0]  # Top 5 factors
+        ]
         
         return {
             'trust_score': trust_score,
             'score_band': score_band,
-            'factors': factor_contributions[:5],  # Top 5 factors
-            'prediction_confidence': min(0.95, max(0.7, self.model.score(
-                self.scaler.transform([features[0]]), [trust_score]
-            )))
+            'factors': factor_contributions,
+            'prediction_confidence': float(confidence[0])
+        }
+    
+    def predict_trust_scores(self, data, top_k=5):
+        """
+        Predict trust scores for many users with a single scaler and model pass
+        Returns parallel arrays: scores, bands and the top_k factor contributions per user
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        
+        features = self.create_features_batch(data)
+        features_scaled = self.scaler.transform(features)
+        raw_scores, confidence = self._forest_predict(features_scaled)
+        
+        # Same truncation and clamping as the single-user path
+        trust_scores = np.clip(np.trunc(raw_scores), 300, 900).astype(np.int64)
+        
+        # Rank per-user factor contributions (skipped entirely when top_k is 0)
+        if top_k:
+            _, contributions = self._attribution_engine().explain(features_scaled)
+        else:
+            contributions = np.empty_like(features)
+        factor_index = self.top_factors(contributions, top_k)
+        
+        return {
+            'trust_score': trust_scores,
+            'score_band': self.score_band_lookup(trust_scores),
+            'factors': np.array(list(self.feature_importance.keys()))[factor_index],
+            'factor_contribution': np.take_along_axis(contributions, factor_index, axis=1),
+            'factor_value': np.take_along_axis(features, factor_index, axis=1),
+            'prediction_confidence': confidence
         }
+    
+    def split_bulk_results(self, results):
+        """Turn predict_trust_scores output into per-user dicts shaped like predict_trust_score"""
+        return [
+            {
+                'trust_score': int(results['trust_score'][i]),
+                'score_band': str(results['score_band'][i]),
+                'factors': [
+                    {'factor': str(name), 'contribution': float(contribution), 'value': float(value)}
+                    for name, contribution, value in zip(
+                        results['factors'][i], results['factor_contribution'][i], results['factor_value'][i]
+                    )
+                ],
+                'prediction_confidence': float(results['prediction_confidence'][i])
+            }
+            for i in range(len(results['trust_score']))
+        ]
 
-# Initialize and train the model
-print("🤖 Initializing Sure Circle Trust Scoring Model...")
-trust_scorer = SureCircleTrustScorer()
+if __name__ == "__main__":
+    # Initialize and train the model
+    print("🤖 Initializing Sure Circle Trust Scoring Model...")
+    trust_scorer = SureCircleTrustScorer()
 
-# Generate training data
-print("📊 Generating synthetic training data...")
-training_data = trust_scorer.generate_synthetic_data(2000)
+    # Generate training data
+    print("📊 Generating synthetic training data...")
+    training_data = trust_scorer.generate_synthetic_data(2000)
 
-# Train the model
-print("🎯 Training ML model...")
-metrics = trust_scorer.train_model(training_data)
+    # Train the model
+    print("🎯 Training ML model...")
+    metrics = trust_scorer.train_model(training_data)
+    
+    # Persist the artifact so scoring workers can load instead of retraining
+    print("💾 Saving model artifact...")
+    trust_scorer.save(MODEL_ARTIFACT_PATH)
 
-print(f"""
+    print(f"""
 ✅ Model Training Complete!
 
 📈 Model Performance:
    - R² Score: {metrics['r2_score']:.3f}
    - MSE: {metrics['mse']:.2f}
+   - Serving: {metrics['serving_model']}
 
 🔍 Top Feature Importance:
 """)
 
-# Sort and display feature importance
-sorted_features = sorted(metrics['feature_importance'].items(), key=lambda x: x[1], reverse=True)
-for feature, importance in sorted_features[:7]:
-    print(f"   - {feature}: {importance:.3f}")
+    # Sort and display feature importance
+    sorted_features = sorted(metrics['feature_importance'].items(), key=lambda x: x[1], reverse=True)
+    for feature, importance in sorted_features[:7]:
+        print(f"   - {feature}: {importance:.3f}")
 
-# Test the model with sample users
-print("\n🧪 Testing model with sample users:")
+    # Test the model with sample users
+    print("\n🧪 Testing model with sample users:")
 
-test_users = [
-    {
-        'months_active': 18,
-        'total_contributions': 18,
-        'on_time_contributions': 17,
-        'payment_variance': 0.1,
-        'claims_submitted': 1,
-        'approved_claims': 1,
-        'voting_opportunities': 36,
-        'votes_participated': 30,
-        'successful_referrals': 3,
-        'kyc_verified': True,
-        'document_verification_score': 0.95,
-        'avg_peer_rating': 4.5,
-        'trusted_connections': 12,
-        'disputes_raised': 0,
-        'coverage_limit': 50000,
-        'avg_claim_amount': 12000
-    },
-    {
-        'months_active': 6,
-        'total_contributions': 5,
-        'on_time_contributions': 4,
-        'payment_variance': 0.3,
-        'claims_submitted': 2,
-        'approved_claims': 1,
-        'voting_opportunities': 12,
-        'votes_participated': 8,
-        'successful_referrals': 1,
-        'kyc_verified': False,
-        'document_verification_score': 0.6,
-        'avg_peer_rating': 3.8,
-        'trusted_connections': 5,
-        'disputes_raised': 1,
-        'coverage_limit': 30000,
-        'avg_claim_amount': 25000
-    }
-]
+    test_users = [
+        {
+            'months_active': 18,
+            'total_contributions': 18,
+            'on_time_contributions': 17,
+            'payment_variance': 0.1,
+            'claims_submitted': 1,
+            'approved_claims': 1,
+            'voting_opportunities': 36,
+            'votes_participated': 30,
+            'successful_referrals': 3,
+            'kyc_verified': True,
+            'document_verification_score': 0.95,
+            'avg_peer_rating': 4.5,
+            'trusted_connections': 12,
+            'disputes_raised': 0,
+            'coverage_limit': 50000,
+            'avg_claim_amount': 12000
+        },
+        {
+            'months_active': 6,
+            'total_contributions': 5,
+            'on_time_contributions': 4,
+            'payment_variance': 0.3,
+            'claims_submitted': 2,
+            'approved_claims': 1,
+            'voting_opportunities': 12,
+            'votes_participated': 8,
+            'successful_referrals': 1,
+            'kyc_verified': False,
+            'document_verification_score': 0.6,
+            'avg_peer_rating': 3.8,
+            'trusted_connections': 5,
+            'disputes_raised': 1,
+            'coverage_limit': 30000,
+            'avg_claim_amount': 25000
+        }
+    ]
 
-for i, user in enumerate(test_users):
-    result = trust_scorer.predict_trust_score(user)
-    print(f"\n👤 Test User {i+1}:")
-    print(f"   Trust Score: {result['trust_score']} ({result['score_band']})")
-    print(f"   Confidence: {result['prediction_confidence']:.2%}")
-    print(f"   Top Factors:")
-    for factor in result['factors'][:3]:
-        print(f"     - {factor['factor']}: {factor['contribution']:.1f}% impact")
\ No newline at end of file
+    for i, user in enumerate(test_users):
+        result = trust_scorer.predict_trust_score(user)
+        print(f"\n👤 Test User {i+1}:")
+        print(f"   Trust Score: {result['trust_score']} ({result['score_band']})")
+        print(f"   Confidence: {result['prediction_confidence']:.2%}")
+        print(f"   Top Factors:")
+        for factor in result['factors'][:3]:
+            print(f"     - {factor['factor']}: {factor['contribution']:+.1f} pts")
\ No newline at end of file
@@ -0,0 +1,114 @@
+# Multi-process sharded rescoring for the Sure Circle member base
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+from profiles import UserProfileTable
+from script_1 import SureCircleTrustScorer
+
+# Per-process state set by _init_worker: the scorer and the memory-mapped member table.
+# Under fork the parent sets the scorer before starting the pool, so workers inherit
+# the forest's arrays copy-on-write instead of each loading a private copy.
+_worker = {}
+
+def shard_of(user_ids, n_shards):
+    """
+    Stable shard number for each integer user_id (splitmix64 finaliser)
+    Consecutive ids spread evenly across shards and the mapping never changes between runs
+    """
+    z = np.asarray(user_ids).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z % np.uint64(n_shards)).astype(np.int64)
+
+def _init_worker(artifact_path, table_path):
+    """Load the model artifact (unless inherited from the parent) and map the member table once per worker"""
+    # One native thread per worker; parallelism comes from the process pool
+    threadpool_limits(1)
+    if 'scorer' not in _worker:
+        _worker['scorer'] = SureCircleTrustScorer.load(artifact_path, mmap_mode='r')
+    _worker['table'] = UserProfileTable.load(table_path, mmap_mode='r')
+
+def _score_task(task):
+    """Score one chunk of row indices from a single shard"""
+    shard, rows = task
+    chunk = _worker['table'][rows]
+    results = _worker['scorer'].predict_trust_scores(chunk, top_k=0)
+    return shard, rows, results['trust_score'].astype(np.int16), results['prediction_confidence'].astype(np.float32)
+
+def _shard_tasks(user_ids, n_shards, chunk_size):
+    """Split row indices by user_id shard, then into chunk_size tasks"""
+    shards = shard_of(user_ids, n_shards)
+    order = np.argsort(shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(n_shards + 1))
+
+    tasks = []
+    for shard in range(n_shards):
+        shard_rows = order[bounds[shard]:bounds[shard + 1]]
+        for start in range(0, len(shard_rows), chunk_size):
+            tasks.append((shard, shard_rows[start:start + chunk_size]))
+    return tasks
+
+def rescore_sharded(artifact_path, table, n_workers=None, n_shards=None, chunk_size=50_000, progress=None):
+    """
+    Rescore a member table across a process pool, sharded by user_id hash
+
+    table is a UserProfileTable or the path of one saved with UserProfileTable.save.
+    The artifact is loaded once in the parent; with the fork start method workers
+    inherit that scorer and share its pages, otherwise each loads its own copy.
+    Workers memory-map the table in their initializer, so only row indices and
+    result arrays cross process boundaries. Results are
+    merged back into the table's row order. progress, if given, is called with a
+    dict of rows done, total rows and elapsed seconds after every task.
+    """
+    n_workers = n_workers or os.cpu_count()
+    n_shards = n_shards or n_workers * 4
+    scorer = SureCircleTrustScorer.load(artifact_path, mmap_mode='r')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if isinstance(table, UserProfileTable):
+            table_path = table.save(os.path.join(tmp, 'members.npy'))
+        else:
+            table_path = table
+            table = UserProfileTable.load(table_path)
+
+        n_rows = len(table)
+        tasks = _shard_tasks(table['user_id'], n_shards, chunk_size)
+        trust_score = np.empty(n_rows, dtype=np.int16)
+        confidence = np.empty(n_rows, dtype=np.float32)
+
+        # Prefer fork so workers inherit already-imported modules and the loaded scorer
+        method = 'fork' if 'fork' in mp.get_all_start_methods() else None
+        context = mp.get_context(method)
+
+        start = time.perf_counter()
+        done = 0
+        if context.get_start_method() == 'fork':
+            _worker['scorer'] = scorer
+        try:
+            with context.Pool(n_workers, initializer=_init_worker, initargs=(artifact_path, table_path)) as pool:
+                for _, rows, scores, conf in pool.imap_unordered(_score_task, tasks):
+                    trust_score[rows] = scores
+                    confidence[rows] = conf
+                    done += len(rows)
+                    if progress is not None:
+                        progress({'rows_done': done, 'rows_total': n_rows, 'seconds': time.perf_counter() - start})
+        finally:
+            _worker.pop('scorer', None)
+
+        user_ids = np.array(table['user_id'])
+
+    # Bands come from the artifact so custom score_bands are honoured
+    return {
+        'user_id': user_ids,
+        'trust_score': trust_score,
+        'score_band': scorer.score_band_lookup(trust_score),
+        'prediction_confidence': confidence
+    }
@@ -0,0 +1,99 @@
+# Vectorized Monte Carlo solvency simulation for Sure Circle pool configurations
+import numpy as np
+
+# Claim assumptions from SureCircleTrustScorer.generate_synthetic_data:
+# claims_submitted ~ Poisson(months_active / 12), avg_claim_amount ~ Exponential(15000)
+CLAIMS_PER_MEMBER_MONTH = 1 / 12
+MEAN_CLAIM_AMOUNT = 15000.0
+
+# Pool columns read from pools rows, with the value used when a field is missing or NULL
+POOL_FIELDS = {
+    'max_members': None,
+    'monthly_contribution': 0.0,
+    'coverage_limit': np.inf,
+    'deductible': 0.0,
+    'initial_reserve': 0.0
+}
+
+def _pool_columns(pools):
+    """Pools as a list of row dicts (e.g. TrustStore.query on pools) or a dict of columns"""
+    if isinstance(pools, dict):
+        n = len(np.atleast_1d(pools['max_members']))
+        rows = None
+    else:
+        rows = list(pools)
+        n = len(rows)
+
+    columns = {}
+    for name, default in POOL_FIELDS.items():
+        if rows is None:
+            values = np.asarray(pools.get(name, np.full(n, default)), dtype=object).reshape(n)
+        else:
+            values = np.array([row.get(name) for row in rows], dtype=object)
+        missing = np.array([value is None for value in values], dtype=bool)
+        if default is None and missing.any():
+            raise ValueError(f"Every pool needs {name}")
+        values[missing] = default
+        columns[name] = values.astype(np.float64)
+    return columns
+
+def simulate_pool_solvency(pools, n_scenarios=10_000, months=12, seed=42, percentiles=(5, 50, 95),
+                           max_cells=1_000_000):
+    """
+    Simulate every pool configuration over n_scenarios independent futures of months months
+
+    Each month a full pool collects max_members * monthly_contribution, then pays
+    each claim min(max(amount - deductible, 0), coverage_limit); claim counts are
+    Poisson(max_members / 12) and amounts Exponential(15000). A scenario is ruined if
+    the reserve goes negative at any month end. All (pool, scenario) paths of a chunk
+    of at most max_cells pool-months are simulated at once as NumPy arrays.
+
+    Returns per-pool arrays: ruin_probability, expected_final_reserve,
+    final_reserve_percentiles and min_reserve_percentiles (n_pools x len(percentiles)),
+    and expected_loss_ratio (claims paid / contributions collected).
+    """
+    cols = _pool_columns(pools)
+    n_pools = len(cols['max_members'])
+    if n_pools == 0:
+        raise ValueError("No pools to simulate")
+
+    rng = np.random.default_rng(seed)
+    income = cols['max_members'] * cols['monthly_contribution']
+    claim_rate = cols['max_members'] * CLAIMS_PER_MEMBER_MONTH
+
+    final_reserve = np.empty((n_pools, n_scenarios))
+    min_reserve = np.empty((n_pools, n_scenarios))
+    paid_total = np.zeros(n_pools)
+
+    n_rows = n_pools * n_scenarios
+    rows_per_chunk = max(1, max_cells // months)
+    for start in range(0, n_rows, rows_per_chunk):
+        rows = np.arange(start, min(start + rows_per_chunk, n_rows))
+        pool = rows // n_scenarios
+
+        # 1. Claim counts per (path, month), then one flat draw of every claim amount
+        counts = rng.poisson(np.repeat(claim_rate[pool], months).reshape(len(rows), months))
+        flat_counts = counts.ravel()
+        claim_cell = np.repeat(np.arange(flat_counts.size), flat_counts)
+        claim_pool = pool[claim_cell // months]
+        amounts = rng.exponential(MEAN_CLAIM_AMOUNT, claim_cell.size)
+
+        # 2. Per-claim payout after deductible and coverage limit, summed per (path, month)
+        payouts = np.minimum(np.maximum(amounts - cols['deductible'][claim_pool], 0), cols['coverage_limit'][claim_pool])
+        monthly_paid = np.bincount(claim_cell, weights=payouts, minlength=flat_counts.size).reshape(len(rows), months)
+
+        # 3. Reserve path: initial reserve plus cumulative net cash flow
+        reserve = cols['initial_reserve'][pool, None] + np.cumsum(income[pool, None] - monthly_paid, axis=1)
+        final_reserve[pool, rows % n_scenarios] = reserve[:, -1]
+        min_reserve[pool, rows % n_scenarios] = reserve.min(axis=1)
+        paid_total += np.bincount(pool, weights=monthly_paid.sum(axis=1), minlength=n_pools)
+
+    collected = income * months * n_scenarios
+    return {
+        'ruin_probability': (min_reserve < 0).mean(axis=1),
+        'expected_final_reserve': final_reserve.mean(axis=1),
+        'percentiles': np.asarray(percentiles),
+        'final_reserve_percentiles': np.percentile(final_reserve, percentiles, axis=1).T,
+        'min_reserve_percentiles': np.percentile(min_reserve, percentiles, axis=1).T,
+        'expected_loss_ratio': np.divide(paid_total, collected, out=np.full(n_pools, np.inf), where=collected > 0)
+    }
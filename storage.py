@@ -0,0 +1,609 @@
+# SQLite storage layer generated from the Sure Circle database schema
+import functools
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+
+from script import database_schema
+from script_1 import FEATURE_INPUTS
+
+# Schema base types -> SQLite column types
+SQLITE_TYPES = {
+    'UUID': 'TEXT', 'VARCHAR': 'TEXT', 'TEXT': 'TEXT', 'JSON': 'TEXT', 'ENUM': 'TEXT',
+    'DATE': 'TEXT', 'TIMESTAMP': 'TEXT', 'INTEGER': 'INTEGER', 'DECIMAL': 'REAL'
+}
+
+# Secondary indexes, chosen for the per-user aggregates and the claim/vote lookups
+STORAGE_INDEXES = {
+    'contributions': [('user_id', 'created_at'), ('pool_id',)],
+    'claims': [('pool_id', 'status'), ('claimant_id',)],
+    'claim_votes': [('claim_id',), ('voter_id',)],
+    'pool_members': [('user_id',), ('pool_id',)],
+    'trust_scores': [('user_id', 'calculated_at')],
+    'user_activities': [('user_id', 'created_at')]
+}
+
+_TYPE_PATTERN = re.compile(r"^(\w+)(?:\(([^)]*)\))?")
+_CLAUSE_PATTERNS = {
+    'primary_key': re.compile(r"\bPRIMARY KEY\b"),
+    'unique': re.compile(r"\bUNIQUE\b"),
+    'not_null': re.compile(r"\bNOT NULL\b"),
+    'on_update': re.compile(r"\bON UPDATE (\w+)"),
+    'default': re.compile(r"\bDEFAULT ('[^']*'|[\w.]+)"),
+    'references': re.compile(r"\bREFERENCES (\w+)\((\w+)\)")
+}
+
+def parse_column_type(type_string):
+    """
+    Parse a schema type string such as "UUID REFERENCES users(user_id)" into a dict
+    with base type, type arguments, enum values and constraint clauses
+    """
+    match = _TYPE_PATTERN.match(type_string.strip())
+    if match is None or match.group(1).upper() not in SQLITE_TYPES:
+        raise ValueError(f"Unsupported column type: {type_string!r}")
+
+    base, args = match.group(1).upper(), match.group(2)
+    column = {
+        'base': base,
+        'sqlite_type': SQLITE_TYPES[base],
+        'args': [],
+        'enum': None,
+        'primary_key': False,
+        'unique': False,
+        'not_null': False,
+        'default': None,
+        'on_update': None,
+        'references': None
+    }
+    if base == 'ENUM':
+        column['enum'] = re.findall(r"'([^']*)'", args or '')
+    elif args:
+        column['args'] = [int(arg) for arg in args.split(',')]
+
+    # ON UPDATE is stripped first so its value is not mistaken for a DEFAULT
+    rest = type_string.strip()[match.end():]
+    for name in ('on_update', 'primary_key', 'unique', 'not_null', 'default', 'references'):
+        found = _CLAUSE_PATTERNS[name].search(rest)
+        if found is None:
+            continue
+        if name in ('on_update', 'default'):
+            column[name] = found.group(1)
+        elif name == 'references':
+            column[name] = (found.group(1), found.group(2))
+        else:
+            column[name] = True
+        rest = rest[:found.start()] + rest[found.end():]
+
+    if rest.strip():
+        raise ValueError(f"Unrecognised clause {rest.strip()!r} in column type {type_string!r}")
+    return column
+
+def parse_schema(schema=None):
+    """Parse every column of a database_schema-style dict: {table: {column: parsed type}}"""
+    schema = database_schema if schema is None else schema
+    return {table: {name: parse_column_type(spec) for name, spec in columns.items()} for table, columns in schema.items()}
+
+def _column_ddl(name, column):
+    parts = [name, column['sqlite_type']]
+    if column['primary_key']:
+        parts.append('PRIMARY KEY')
+    if column['not_null']:
+        parts.append('NOT NULL')
+    if column['unique']:
+        parts.append('UNIQUE')
+    if column['default'] is not None:
+        parts.append(f"DEFAULT {column['default']}")
+    if column['enum'] is not None:
+        values = ', '.join("'" + value.replace("'", "''") + "'" for value in column['enum'])
+        parts.append(f"CHECK ({name} IN ({values}))")
+    if column['references'] is not None:
+        parts.append('REFERENCES {}({})'.format(*column['references']))
+    return ' '.join(parts)
+
+def generate_ddl(schema=None, indexes=None):
+    """CREATE TABLE, CREATE INDEX and ON UPDATE trigger statements for a schema"""
+    parsed = parse_schema(schema)
+    indexes = STORAGE_INDEXES if indexes is None else indexes
+
+    statements = []
+    for table, columns in parsed.items():
+        body = ',\n    '.join(_column_ddl(name, column) for name, column in columns.items())
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n)")
+
+        for index_columns in indexes.get(table, []):
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(index_columns)} "
+                f"ON {table} ({', '.join(index_columns)})"
+            )
+
+        # SQLite has no ON UPDATE column clause; emulate it with a trigger
+        for name, column in columns.items():
+            if column['on_update'] is not None:
+                statements.append(
+                    f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{name}_on_update AFTER UPDATE ON {table} "
+                    f"FOR EACH ROW WHEN NEW.{name} IS OLD.{name} "
+                    f"BEGIN UPDATE {table} SET {name} = {column['on_update']} WHERE rowid = NEW.rowid; END"
+                )
+    return statements
+
+# Materialized per-user counters for create_features, maintained by triggers on
+# every insert (and claim/contribution status change) in the source tables
+AGGREGATE_DDL = [
+    """CREATE TABLE IF NOT EXISTS user_aggregates (
+    user_id TEXT PRIMARY KEY,
+    total_contributions INTEGER NOT NULL DEFAULT 0,
+    on_time_contributions INTEGER NOT NULL DEFAULT 0,
+    contribution_months INTEGER NOT NULL DEFAULT 0,
+    payment_count INTEGER NOT NULL DEFAULT 0,
+    payment_sum REAL NOT NULL DEFAULT 0,
+    payment_sum_squares REAL NOT NULL DEFAULT 0,
+    claims_submitted INTEGER NOT NULL DEFAULT 0,
+    approved_claims INTEGER NOT NULL DEFAULT 0,
+    claim_amount_total REAL NOT NULL DEFAULT 0,
+    claim_amount_count INTEGER NOT NULL DEFAULT 0,
+    votes_participated INTEGER NOT NULL DEFAULT 0,
+    voting_opportunities INTEGER NOT NULL DEFAULT 0,
+    coverage_limit REAL,
+    disputes_raised INTEGER NOT NULL DEFAULT 0
+)""",
+    # Distinct contribution months per user, so contribution_months stays exact
+    """CREATE TABLE IF NOT EXISTS user_contribution_months (
+    user_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    PRIMARY KEY (user_id, month)
+) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_contribution AFTER INSERT ON contributions
+BEGIN
+    INSERT INTO user_aggregates (user_id) VALUES (NEW.user_id) ON CONFLICT (user_id) DO NOTHING;
+    UPDATE user_aggregates SET
+        total_contributions = total_contributions + 1,
+        on_time_contributions = on_time_contributions + (NEW.status IS 'successful'),
+        payment_count = payment_count + (NEW.amount IS NOT NULL),
+        payment_sum = payment_sum + COALESCE(NEW.amount, 0),
+        payment_sum_squares = payment_sum_squares + COALESCE(NEW.amount * NEW.amount, 0),
+        contribution_months = contribution_months + NOT EXISTS (
+            SELECT 1 FROM user_contribution_months
+            WHERE user_id = NEW.user_id AND month = substr(NEW.created_at, 1, 7)
+        )
+    WHERE user_id = NEW.user_id;
+    INSERT OR IGNORE INTO user_contribution_months (user_id, month) VALUES (NEW.user_id, substr(NEW.created_at, 1, 7));
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_contribution_status AFTER UPDATE OF status ON contributions
+BEGIN
+    UPDATE user_aggregates
+    SET on_time_contributions = on_time_contributions + (NEW.status IS 'successful') - (OLD.status IS 'successful')
+    WHERE user_id = NEW.user_id;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_claim AFTER INSERT ON claims
+BEGIN
+    INSERT INTO user_aggregates (user_id) VALUES (NEW.claimant_id) ON CONFLICT (user_id) DO NOTHING;
+    UPDATE user_aggregates SET
+        claims_submitted = claims_submitted + 1,
+        approved_claims = approved_claims + COALESCE(NEW.status IN ('approved', 'paid'), 0),
+        claim_amount_total = claim_amount_total + COALESCE(NEW.amount_requested, 0),
+        claim_amount_count = claim_amount_count + (NEW.amount_requested IS NOT NULL)
+    WHERE user_id = NEW.claimant_id;
+    -- Every other member who had joined the pool gets a voting opportunity
+    INSERT INTO user_aggregates (user_id, voting_opportunities)
+    SELECT user_id, 1 FROM pool_members
+    WHERE pool_id = NEW.pool_id AND user_id != NEW.claimant_id AND joined_at <= NEW.created_at
+    ON CONFLICT (user_id) DO UPDATE SET voting_opportunities = voting_opportunities + 1;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_claim_status AFTER UPDATE OF status ON claims
+BEGIN
+    UPDATE user_aggregates
+    SET approved_claims = approved_claims + COALESCE(NEW.status IN ('approved', 'paid'), 0) - COALESCE(OLD.status IN ('approved', 'paid'), 0)
+    WHERE user_id = NEW.claimant_id;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_vote AFTER INSERT ON claim_votes
+BEGIN
+    INSERT INTO user_aggregates (user_id, votes_participated) VALUES (NEW.voter_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET votes_participated = votes_participated + 1;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_membership AFTER INSERT ON pool_members
+BEGIN
+    INSERT INTO user_aggregates (user_id, coverage_limit)
+    VALUES (NEW.user_id, (SELECT coverage_limit FROM pools WHERE pool_id = NEW.pool_id))
+    ON CONFLICT (user_id) DO UPDATE SET coverage_limit = MAX(COALESCE(coverage_limit, excluded.coverage_limit), excluded.coverage_limit);
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_aggregates_dispute AFTER INSERT ON user_activities
+WHEN NEW.activity_type = 'dispute'
+BEGIN
+    INSERT INTO user_aggregates (user_id, disputes_raised) VALUES (NEW.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET disputes_raised = disputes_raised + 1;
+END"""
+]
+
+# (user_aggregates columns, per-user GROUP BY) pairs used by TrustStore.rebuild_aggregates
+REBUILD_AGGREGATE_QUERIES = [
+    (('claims_submitted', 'approved_claims', 'claim_amount_total', 'claim_amount_count'),
+     """SELECT claimant_id, COUNT(*), SUM(COALESCE(status IN ('approved', 'paid'), 0)), COALESCE(SUM(amount_requested), 0),
+               COUNT(amount_requested)
+        FROM claims GROUP BY claimant_id"""),
+    (('votes_participated',),
+     "SELECT voter_id, COUNT(*) FROM claim_votes GROUP BY voter_id"),
+    (('voting_opportunities',),
+     """SELECT m.user_id, COUNT(*) FROM pool_members m JOIN claims c ON c.pool_id = m.pool_id
+        WHERE c.claimant_id != m.user_id AND c.created_at >= m.joined_at GROUP BY m.user_id"""),
+    (('coverage_limit',),
+     """SELECT m.user_id, MAX(p.coverage_limit) FROM pool_members m JOIN pools p ON p.pool_id = m.pool_id
+        GROUP BY m.user_id"""),
+]
+
+# Per-user monthly summary columns of the month-partitioned tables, as aggregate
+# expressions over one table's rows. Live partitions are aggregated with these on
+# read; compaction stores them in partition_summaries so archived months never
+# need to be read back from Parquet for scorer inputs.
+PARTITION_SUMMARY_COLUMNS = {
+    'contributions': {
+        'row_count': 'COUNT(*)',
+        'successful_count': "SUM(status IS 'successful')",
+        'amount_count': 'COUNT(amount)',
+        'amount_sum': 'COALESCE(SUM(amount), 0)',
+        'amount_sum_squares': 'COALESCE(SUM(amount * amount), 0)'
+    },
+    'user_activities': {
+        'row_count': 'COUNT(*)',
+        'dispute_count': "SUM(activity_type IS 'dispute')"
+    }
+}
+
+def _partition_table(table, month):
+    """Physical SQLite table holding one 'YYYY-MM' month of a partitioned table"""
+    return f"{table}_{month.replace('-', '_')}"
+
+def _to_sql(value, column):
+    """Convert a Python value into what the SQLite column stores"""
+    if value is None:
+        return None
+    if column['base'] == 'JSON' and not isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class TrustStore:
+    """
+    SQLite database created from database_schema, with batched insert and query helpers
+    Per-user scorer inputs are aggregated with indexed GROUP BY queries over the
+    requested users only, instead of loading every row the way gatherUserData does.
+    With the default schema, triggers also keep the user_aggregates table current
+    on every insert, so aggregate_inputs is a single row read per user.
+    """
+
+    def __init__(self, path=':memory:', schema=None):
+        self.path = path
+        self.schema = parse_schema(schema)
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # The connection is shared across threads; transactions hold this lock so one
+        # thread's BEGIN ... COMMIT never interleaves with another's
+        self._lock = threading.RLock()
+        self.connection.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in generate_ddl(schema):
+            self.connection.execute(statement)
+        if schema is None:
+            for statement in AGGREGATE_DDL:
+                self.connection.execute(statement)
+
+    def close(self):
+        self.connection.close()
+
+    # Writes
+
+    def insert_many(self, table, rows, batch_size=10_000):
+        """
+        Insert row dicts in batched transactions; returns the number of rows inserted
+        A missing primary key gets a generated UUID; omitted columns take their DEFAULT
+        """
+        columns = self.schema.get(table)
+        if columns is None:
+            raise ValueError(f"Unknown table: {table}")
+        primary_key = next((name for name, column in columns.items() if column['primary_key']), None)
+
+        inserted = 0
+        batch = []
+        for row in rows:
+            unknown = set(row) - set(columns)
+            if unknown:
+                raise ValueError(f"Unknown columns for {table}: {sorted(unknown)}")
+            if primary_key is not None and row.get(primary_key) is None:
+                row = dict(row, **{primary_key: str(uuid.uuid4())})
+            batch.append(row)
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(table, columns, batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(table, columns, batch)
+        return inserted
+
+    def _insert_batch(self, table, columns, batch):
+        # Group rows by their column set so omitted columns still get their DEFAULT
+        groups = {}
+        for row in batch:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        with self.transaction():
+            for names, rows in groups.items():
+                sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+                self.connection.executemany(
+                    sql, ([_to_sql(row[name], columns[name]) for name in names] for row in rows)
+                )
+        return len(batch)
+
+    def transaction(self):
+        """Context manager for one IMMEDIATE transaction, exclusive among this store's threads"""
+        return _Transaction(self.connection, self._lock)
+
+    # Reads
+
+    def query(self, sql, params=()):
+        """Run a query and return all rows as dicts"""
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def iter_query(self, sql, params=(), batch_size=10_000):
+        """Yield lists of row dicts, batch_size rows at a time"""
+        cursor = self.connection.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+
+    def explain(self, sql, params=()):
+        """SQLite query plan lines for a statement, e.g. to confirm an index is used"""
+        return [row['detail'] for row in self.connection.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    # Scorer inputs
+
+    def _load_user_keys(self, user_ids):
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS score_users (user_id TEXT PRIMARY KEY, row INTEGER)")
+        self.connection.execute("DELETE FROM score_users")
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO score_users (user_id, row) VALUES (?, ?)",
+            ((str(uid), i) for i, uid in enumerate(user_ids))
+        )
+
+    def _fill_columns(self, cols, sql, names, params=()):
+        """Scatter (row, value...) query results into the named input columns"""
+        for row in self.connection.execute(sql, params):
+            for name, value in zip(names, row[1:]):
+                if value is not None:
+                    cols[name][row[0]] = value
+
+    def _live_partitions(self, table):
+        """(SQLite partition table names, archived month count) for table from partition_catalog"""
+        has_catalog = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partition_catalog'"
+        ).fetchone()
+        if not has_catalog:
+            return [], 0
+        rows = self.connection.execute(
+            "SELECT month, storage FROM partition_catalog WHERE table_name = ? ORDER BY month", (table,)
+        ).fetchall()
+        live = [_partition_table(table, month) for month, storage in rows if storage == 'sqlite']
+        return live, len(rows) - len(live)
+
+    def _monthly_partials(self, table, per_user=False):
+        """
+        UNION ALL of (owner, month, PARTITION_SUMMARY_COLUMNS...) partial aggregates
+        over the base table, its live month partitions and its archived month summaries
+        per_user=True keys rows by score_users.row through a (user_id, ...) index seek
+        per requested user; otherwise owner is the user_id, over every user.
+        """
+        summary = PARTITION_SUMMARY_COLUMNS[table]
+        if per_user:
+            owner, source = 's.row', "score_users s CROSS JOIN {} t ON t.user_id = s.user_id"
+        else:
+            owner, source = 't.user_id', "{} t"
+
+        live, archived = self._live_partitions(table)
+        parts = [
+            f"SELECT {owner} AS owner, substr(t.created_at, 1, 7) AS month, "
+            + ', '.join(f"{expression} AS {name}" for name, expression in summary.items())
+            + f" FROM {source.format(name)} GROUP BY 1, 2"
+            for name in [table] + live
+        ]
+        if archived:
+            parts.append(
+                f"SELECT {owner}, t.month, {', '.join('t.' + name for name in summary)} "
+                f"FROM {source.format('partition_summaries')} WHERE t.table_name = '{table}'"
+            )
+        return ' UNION ALL '.join(parts)
+
+    def feature_inputs(self, user_ids, now=None):
+        """
+        create_features input columns for user_ids, in the given order
+        Each aggregate is one GROUP BY over an index seek per requested user;
+        CROSS JOIN pins the requested-users temp table as the outer loop.
+        Inputs with no source table (referrals, peer ratings, connections, document
+        score) keep their FEATURE_INPUTS defaults. Contributions and activities include
+        rows in MonthPartitionedTable partitions and archived months.
+        """
+        user_ids = list(user_ids)
+        now = (now or datetime.now()).isoformat(sep=' ', timespec='seconds')
+        cols = _default_columns(len(user_ids))
+        fill = functools.partial(self._fill_columns, cols)
+
+        with self.transaction():
+            self._load_user_keys(user_ids)
+
+            # 1. User record: tenure (as calculateMonthsActive) and KYC
+            fill("""
+                SELECT s.row,
+                       MAX(1, CAST(ROUND((julianday(?) - julianday(u.created_at)) / 30) AS INTEGER)),
+                       u.kyc_status = 'verified'
+                FROM score_users s CROSS JOIN users u ON u.user_id = s.user_id
+            """, ('months_active', 'kyc_verified'), (now,))
+
+            # 2. Contributions: counts, distinct months and payment coefficient of variation,
+            #    combined from per-month partials across partitions and archived months
+            fill(f"""
+                SELECT owner, SUM(row_count), SUM(successful_count), COUNT(DISTINCT month),
+                       CASE WHEN SUM(amount_count) >= 2 AND SUM(amount_sum) > 0
+                            THEN MIN(sqrt(MAX(SUM(amount_sum_squares) / SUM(amount_count)
+                                              - (SUM(amount_sum) / SUM(amount_count)) * (SUM(amount_sum) / SUM(amount_count)), 0))
+                                     / (SUM(amount_sum) / SUM(amount_count)), 1)
+                            ELSE 0 END
+                FROM ({self._monthly_partials('contributions', per_user=True)})
+                GROUP BY owner
+            """, ('total_contributions', 'on_time_contributions', 'contribution_months', 'payment_variance'))
+
+            # 3. Claims submitted by the user; paid claims were approved first
+            fill("""
+                SELECT s.row, COUNT(*), SUM(c.status IN ('approved', 'paid')), AVG(c.amount_requested)
+                FROM score_users s CROSS JOIN claims c ON c.claimant_id = s.user_id
+                GROUP BY s.row
+            """, ('claims_submitted', 'approved_claims', 'avg_claim_amount'))
+
+            # 4. Votes cast, and voting opportunities: other members' claims in the user's pools since joining
+            fill("""
+                SELECT s.row, COUNT(*)
+                FROM score_users s CROSS JOIN claim_votes v ON v.voter_id = s.user_id
+                GROUP BY s.row
+            """, ('votes_participated',))
+            fill("""
+                SELECT s.row, MAX(COUNT(*), 1)
+                FROM score_users s
+                CROSS JOIN pool_members m ON m.user_id = s.user_id
+                CROSS JOIN claims c ON c.pool_id = m.pool_id
+                WHERE c.claimant_id != s.user_id AND c.created_at >= m.joined_at
+                GROUP BY s.row
+            """, ('voting_opportunities',))
+
+            # 5. Largest coverage limit among the user's pools, and disputes from the activity log
+            fill("""
+                SELECT s.row, MAX(p.coverage_limit)
+                FROM score_users s
+                CROSS JOIN pool_members m ON m.user_id = s.user_id
+                CROSS JOIN pools p ON p.pool_id = m.pool_id
+                GROUP BY s.row
+            """, ('coverage_limit',))
+            fill(f"""
+                SELECT owner, SUM(dispute_count)
+                FROM ({self._monthly_partials('user_activities', per_user=True)})
+                GROUP BY owner
+            """, ('disputes_raised',))
+
+        return cols
+
+    def aggregate_inputs(self, user_ids, now=None):
+        """
+        create_features input columns read from the materialized user_aggregates table
+        One primary-key row read per user (plus the user record), instead of the
+        per-request aggregation in feature_inputs; the values are identical. Like
+        feature_inputs, users with no contributions keep the FEATURE_INPUTS payment
+        defaults, and claims without an amount are left out of avg_claim_amount.
+        """
+        user_ids = list(user_ids)
+        now = (now or datetime.now()).isoformat(sep=' ', timespec='seconds')
+        cols = _default_columns(len(user_ids))
+
+        with self.transaction():
+            self._load_user_keys(user_ids)
+            self._fill_columns(cols, """
+                SELECT s.row,
+                       MAX(1, CAST(ROUND((julianday(?) - julianday(u.created_at)) / 30) AS INTEGER)),
+                       u.kyc_status = 'verified'
+                FROM score_users s CROSS JOIN users u ON u.user_id = s.user_id
+            """, ('months_active', 'kyc_verified'), (now,))
+            self._fill_columns(cols, """
+                SELECT s.row, a.total_contributions, a.on_time_contributions, a.contribution_months,
+                       CASE WHEN a.payment_count >= 2 AND a.payment_sum > 0
+                            THEN MIN(sqrt(MAX(a.payment_sum_squares / a.payment_count
+                                              - (a.payment_sum / a.payment_count) * (a.payment_sum / a.payment_count), 0))
+                                     / (a.payment_sum / a.payment_count), 1)
+                            ELSE 0 END
+                FROM score_users s CROSS JOIN user_aggregates a ON a.user_id = s.user_id
+                WHERE a.total_contributions > 0
+            """, ('total_contributions', 'on_time_contributions', 'contribution_months', 'payment_variance'))
+            self._fill_columns(cols, """
+                SELECT s.row, a.claims_submitted, a.approved_claims,
+                       a.claim_amount_total / NULLIF(a.claim_amount_count, 0),
+                       a.votes_participated, MAX(a.voting_opportunities, 1),
+                       a.coverage_limit, a.disputes_raised
+                FROM score_users s CROSS JOIN user_aggregates a ON a.user_id = s.user_id
+            """, ('claims_submitted', 'approved_claims', 'avg_claim_amount',
+                  'votes_participated', 'voting_opportunities', 'coverage_limit', 'disputes_raised'))
+        return cols
+
+    def rebuild_aggregates(self):
+        """
+        Recompute user_aggregates from the source tables, e.g. after a bulk load with triggers bypassed
+        Partitioned months count too: live partitions are re-read and archived
+        months come from their partition_summaries rows.
+        """
+        with self.transaction() as connection:
+            contributions = self._monthly_partials('contributions')
+            connection.execute("DELETE FROM user_aggregates")
+            connection.execute("DELETE FROM user_contribution_months")
+            connection.execute(f"""
+                INSERT INTO user_contribution_months (user_id, month)
+                SELECT DISTINCT owner, month FROM ({contributions}) WHERE month IS NOT NULL
+            """)
+            connection.execute(f"""
+                INSERT INTO user_aggregates (user_id, total_contributions, on_time_contributions,
+                                             payment_count, payment_sum, payment_sum_squares, contribution_months)
+                SELECT owner, SUM(row_count), SUM(successful_count), SUM(amount_count), SUM(amount_sum),
+                       SUM(amount_sum_squares), COUNT(DISTINCT month)
+                FROM ({contributions}) GROUP BY owner
+            """)
+            rebuild_queries = REBUILD_AGGREGATE_QUERIES + [(
+                ('disputes_raised',),
+                f"SELECT owner, SUM(dispute_count) FROM ({self._monthly_partials('user_activities')}) "
+                "GROUP BY owner HAVING SUM(dispute_count) > 0"
+            )]
+            for columns, sql in rebuild_queries:
+                assignments = ', '.join(f"{name} = excluded.{name}" for name in columns)
+                connection.execute(f"""
+                    INSERT INTO user_aggregates (user_id, {', '.join(columns)})
+                    SELECT * FROM ({sql}) WHERE true
+                    ON CONFLICT (user_id) DO UPDATE SET {assignments}
+                """)
+
+def _default_columns(n):
+    """FEATURE_INPUTS default columns for n users"""
+    return {name: np.full(n, default, dtype=bool if isinstance(default, bool) else np.float64)
+            for name, default in FEATURE_INPUTS.items()}
+
+class _Transaction:
+    """
+    BEGIN IMMEDIATE ... COMMIT, rolled back on error
+    Holds the store's re-entrant lock for its whole duration, so other threads wait
+    and nested use in the same thread joins the outer transaction.
+    """
+
+    def __init__(self, connection, lock):
+        self.connection = connection
+        self.lock = lock
+        self.owner = False
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            if not self.connection.in_transaction:
+                self.connection.execute('BEGIN IMMEDIATE')
+                self.owner = True
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.owner:
+                self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.lock.release()
+        return False
@@ -0,0 +1,165 @@
+# Out-of-core streaming scorer for Sure Circle member exports
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from script_1 import FEATURE_INPUTS
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Columns read from member exports: the create_features inputs plus the member key
+MEMBER_COLUMNS = ['user_id'] + list(FEATURE_INPUTS)
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet support requires pyarrow: pip install pyarrow")
+    return pq
+
+# Sources: each yields dicts of equal-length column arrays
+
+def iter_csv_chunks(path, chunk_size=DEFAULT_CHUNK_ROWS):
+    """Read a CSV member export in fixed-size chunks, keeping only scorer columns"""
+    reader = pd.read_csv(path, chunksize=chunk_size, usecols=lambda c: c in MEMBER_COLUMNS)
+    for frame in reader:
+        yield {name: frame[name].to_numpy() for name in frame.columns}
+
+def iter_parquet_chunks(path, chunk_size=DEFAULT_CHUNK_ROWS):
+    """Read a Parquet member export in fixed-size record batches"""
+    pq = _require_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    columns = [c for c in parquet_file.schema_arrow.names if c in MEMBER_COLUMNS]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield {name: batch.column(name).to_numpy(zero_copy_only=False) for name in columns}
+
+def iter_npy_chunks(directory, chunk_size=DEFAULT_CHUNK_ROWS):
+    """
+    Read a directory of per-column .npy files (see write_synthetic_population)
+    Columns are memory-mapped, so only the current chunk is paged in
+    """
+    columns = {
+        name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        for name in MEMBER_COLUMNS
+        if os.path.exists(os.path.join(directory, f'{name}.npy'))
+    }
+    if not columns:
+        raise ValueError(f"No member columns found in {directory}")
+
+    n_rows = len(next(iter(columns.values())))
+    for start in range(0, n_rows, chunk_size):
+        yield {name: np.asarray(col[start:start + chunk_size]) for name, col in columns.items()}
+
+def open_member_source(path, chunk_size=DEFAULT_CHUNK_ROWS):
+    """Pick a chunk reader from the path: directory of .npy, .parquet or .csv"""
+    if os.path.isdir(path):
+        return iter_npy_chunks(path, chunk_size)
+    if path.endswith('.parquet'):
+        return iter_parquet_chunks(path, chunk_size)
+    if path.endswith('.csv') or path.endswith('.csv.gz'):
+        return iter_csv_chunks(path, chunk_size)
+    raise ValueError(f"Unsupported member export format: {path}")
+
+# Sinks: write(columns) once per chunk, then close()
+
+class CsvScoreSink:
+    """Append scored chunks to a CSV file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._header = True
+
+    def write(self, columns):
+        pd.DataFrame(columns).to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        pass
+
+class ParquetScoreSink:
+    """Append scored chunks to a Parquet file as row groups"""
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+
+    def write(self, columns):
+        import pyarrow as pa
+        pq = _require_pyarrow()
+        table = pa.table(columns)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def open_score_sink(path):
+    """Pick a result sink from the output path extension"""
+    if path.endswith('.parquet'):
+        return ParquetScoreSink(path)
+    if path.endswith('.csv'):
+        return CsvScoreSink(path)
+    raise ValueError(f"Unsupported score output format: {path}")
+
+class StreamingScorer:
+    """
+    Score member exports chunk by chunk with a fitted SureCircleTrustScorer
+    Each chunk goes through feature extraction, the fitted StandardScaler and one
+    predict call, and its results are written out before the next chunk is read,
+    so memory stays flat regardless of the number of members
+    """
+
+    def __init__(self, scorer, chunk_size=DEFAULT_CHUNK_ROWS, top_k=3):
+        if scorer.model is None:
+            raise ValueError("Model not trained yet")
+        self.scorer = scorer
+        self.chunk_size = chunk_size
+        self.top_k = top_k
+
+    def score_chunk(self, chunk, row_offset=0):
+        """Score one column chunk into flat output columns"""
+        results = self.scorer.predict_trust_scores(chunk, self.top_k)
+        n_rows = len(results['trust_score'])
+
+        output = {
+            'user_id': chunk['user_id'] if 'user_id' in chunk else np.arange(row_offset, row_offset + n_rows),
+            'trust_score': results['trust_score'],
+            'score_band': results['score_band'].astype(str),
+            'prediction_confidence': results['prediction_confidence']
+        }
+        for k in range(results['factors'].shape[1]):
+            output[f'factor_{k + 1}'] = results['factors'][:, k]
+            output[f'factor_{k + 1}_contribution'] = results['factor_contribution'][:, k]
+        return output
+
+    def score_chunks(self, chunks, sink):
+        """Score an iterable of column chunks into sink; returns run statistics"""
+        start = time.perf_counter()
+        n_rows = n_chunks = 0
+        try:
+            for chunk in chunks:
+                output = self.score_chunk(chunk, n_rows)
+                sink.write(output)
+                n_rows += len(output['trust_score'])
+                n_chunks += 1
+        finally:
+            sink.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': n_rows,
+            'chunks': n_chunks,
+            'seconds': elapsed,
+            'rows_per_second': n_rows / elapsed if elapsed > 0 else 0.0
+        }
+
+    def score_file(self, input_path, output_path):
+        """Stream a member export file (or .npy directory) into a score output file"""
+        return self.score_chunks(
+            open_member_source(input_path, self.chunk_size),
+            open_score_sink(output_path)
+        )
@@ -0,0 +1,149 @@
+# Member trust graph and propagated network trust for Sure Circle
+import numpy as np
+from scipy import sparse
+
+class TrustGraph:
+    """
+    Weighted member-to-member trust edges in a CSR adjacency matrix
+
+    Edges come from pool co-membership (both directions) and approving claim
+    votes (voter -> claimant). New edges are buffered and merged into the CSR
+    matrix on the next propagate(), which runs a personalized PageRank by sparse
+    matrix-vector iteration, warm-started from the previous ranks so incremental
+    updates converge in a few iterations.
+    """
+
+    def __init__(self, damping=0.85, tol=1e-8, max_iter=100):
+        self.damping = damping
+        self.tol = tol
+        self.max_iter = max_iter
+        self._index = {}
+        self._pending = []
+        self._adjacency = sparse.csr_matrix((0, 0))
+        self._base_trust = np.zeros(0)
+        self._ranks = np.zeros(0)
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def n_edges(self):
+        self._merge_pending()
+        return self._adjacency.nnz
+
+    def _indices(self, user_ids):
+        """Node index for each user_id, registering unseen users"""
+        index = self._index
+        return np.fromiter((index.setdefault(uid, len(index)) for uid in user_ids),
+                           dtype=np.int64, count=len(user_ids))
+
+    # Edge ingestion
+
+    def add_edges(self, source_ids, target_ids, weights=1.0):
+        """Buffer directed edges source -> target; repeated edges add their weights"""
+        sources = self._indices(source_ids)
+        targets = self._indices(target_ids)
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), sources.shape)
+        keep = sources != targets
+        self._pending.append((sources[keep], targets[keep], weights[keep]))
+
+    def add_pool_members(self, member_ids, weight=1.0):
+        """Connect every pair of members of one pool, in both directions"""
+        members = self._indices(member_ids)
+        i, j = np.triu_indices(len(members), k=1)
+        sources = np.concatenate((members[i], members[j]))
+        targets = np.concatenate((members[j], members[i]))
+        self._pending.append((sources, targets, np.full(len(sources), float(weight))))
+
+    def add_claim_vote(self, voter_id, claimant_id, vote='approve', weight=1.0):
+        """An approving vote is an endorsement from voter to claimant; rejections add no edge"""
+        if vote == 'approve':
+            self.add_edges([voter_id], [claimant_id], weight)
+
+    def set_base_trust(self, user_ids, trust_scores):
+        """Personalization vector: members teleport towards already-trusted members (300-900 scores)"""
+        indices = self._indices(user_ids)
+        if len(self._base_trust) < len(self._index):
+            self._base_trust = np.pad(self._base_trust, (0, len(self._index) - len(self._base_trust)))
+        self._base_trust[indices] = np.clip((np.asarray(trust_scores, dtype=np.float64) - 300) / 600, 0, 1)
+
+    def _merge_pending(self):
+        n = len(self._index)
+        if not self._pending and self._adjacency.shape == (n, n):
+            return
+
+        adjacency = self._adjacency
+        if adjacency.shape != (n, n):
+            adjacency = sparse.csr_matrix(
+                (adjacency.data, adjacency.indices, np.pad(adjacency.indptr, (0, n - adjacency.shape[0]), mode='edge')),
+                shape=(n, n)
+            )
+        if self._pending:
+            sources, targets, weights = (np.concatenate(parts) for parts in zip(*self._pending))
+            adjacency = adjacency + sparse.csr_matrix((weights, (sources, targets)), shape=(n, n))
+            self._pending = []
+        self._adjacency = adjacency
+
+    # Propagation
+
+    def propagate(self):
+        """
+        Recompute propagated trust ranks; returns the number of iterations used
+        r = d * W^T (r / out_weight) + (d * dangling_mass + 1 - d) * v
+        """
+        self._merge_pending()
+        n = len(self._index)
+        if n == 0:
+            return 0
+
+        base = np.pad(self._base_trust, (0, n - len(self._base_trust)))
+        v = base / base.sum() if base.sum() > 0 else np.full(n, 1.0 / n)
+
+        out_weight = np.asarray(self._adjacency.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        inv_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+        transposed = self._adjacency.T.tocsr()
+
+        # Warm start from the previous ranks; new members start from the teleport vector
+        ranks = np.concatenate((self._ranks, v[len(self._ranks):]))
+        ranks /= ranks.sum()
+
+        for iteration in range(1, self.max_iter + 1):
+            updated = self.damping * (transposed @ (ranks * inv_out))
+            updated += (self.damping * ranks[dangling].sum() + 1 - self.damping) * v
+            delta = np.abs(updated - ranks).sum()
+            ranks = updated
+            if delta < self.tol:
+                break
+
+        self._ranks = ranks
+        return iteration
+
+    def effective_connections(self, user_ids=None):
+        """
+        Propagated trust expressed as trust-weighted incoming connections
+
+        Each member's incoming edge weights are scaled by the source's propagated
+        trust relative to the average member (ranks * n), so in a graph where every
+        member is equally trusted this equals the member's weighted in-degree.
+        Connections from highly trusted members count for more, from weak members
+        for less, and a member's own outgoing edges do not raise their count.
+        Same unit as the trusted_connections scorer input.
+        """
+        n = len(self._index)
+        if self._pending or len(self._ranks) != n:
+            self.propagate()
+
+        effective = self._adjacency.T @ (self._ranks * n) if n else np.zeros(0)
+
+        if user_ids is None:
+            return effective
+        indices = np.array([self._index.get(uid, -1) for uid in user_ids], dtype=np.int64)
+        known = indices >= 0
+        result = np.zeros(len(indices))
+        result[known] = effective[indices[known]]
+        return result
+
+    def feature_columns(self, user_ids):
+        """Scorer input columns: trusted_connections replaced by the graph's effective connections"""
+        return {'trusted_connections': self.effective_connections(user_ids)}
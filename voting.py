@@ -0,0 +1,285 @@
+# Claim vote tallying for Sure Circle pools
+import threading
+import uuid
+from datetime import datetime
+
+VOTE_CHOICES = ('approve', 'reject')
+
+# Vote weight multiplier per score band in weighted tallies; unknown bands count as Poor
+BAND_VOTE_WEIGHTS = {'Excellent': 1.0, 'Very Good': 0.85, 'Good': 0.7, 'Fair': 0.55, 'Poor': 0.4}
+
+WEIGHTED_TALLY_DDL = """
+    CREATE TABLE IF NOT EXISTS claim_weighted_tallies (
+        claim_id TEXT PRIMARY KEY REFERENCES claims(claim_id),
+        weight_for REAL NOT NULL DEFAULT 0,
+        weight_against REAL NOT NULL DEFAULT 0,
+        total_weight REAL NOT NULL
+    )
+"""
+
+def decide_claim(votes_for, votes_against, total_votes_required):
+    """
+    Claim status implied by the counters: 'approved' or 'rejected' once the outcome
+    can no longer change, otherwise 'voting'
+    A side wins on reaching a strict majority of total_votes_required; if every
+    required vote is in without one (an even split), the claim is rejected.
+    """
+    majority = total_votes_required // 2 + 1
+    if votes_for >= majority:
+        return 'approved'
+    if votes_against >= majority or votes_for + votes_against >= total_votes_required:
+        return 'rejected'
+    return 'voting'
+
+def decide_weighted_claim(weight_for, weight_against, total_weight):
+    """
+    Weighted counterpart of decide_claim: more than half of total_weight approves, half rejects
+    Requires total_weight > 0; callers fall back to decide_claim otherwise.
+    """
+    if weight_for > total_weight / 2:
+        return 'approved'
+    if weight_against >= total_weight / 2:
+        return 'rejected'
+    return 'voting'
+
+class TrustScoreSnapshot:
+    """
+    Precomputed trust scores and bands used to weight votes, so voting never rescores
+    weight = band multiplier * score / 900, e.g. 1.0 for a perfect score
+    """
+
+    def __init__(self, user_ids, trust_scores, score_bands):
+        self.scores = dict(zip(user_ids, (int(score) for score in trust_scores)))
+        self.weights = {
+            user_id: BAND_VOTE_WEIGHTS.get(band, BAND_VOTE_WEIGHTS['Poor']) * int(score) / 900
+            for user_id, score, band in zip(user_ids, trust_scores, score_bands)
+        }
+
+    def __len__(self):
+        return len(self.scores)
+
+    @classmethod
+    def from_results(cls, user_ids, results):
+        """From a predict_trust_scores (or rescore_sharded) result for user_ids"""
+        return cls(user_ids, results['trust_score'], results['score_band'])
+
+    @classmethod
+    def from_store(cls, store, scorer):
+        """Latest trust_scores row per user; bands from the scorer's score_bands"""
+        rows = store.query("""
+            SELECT user_id, score FROM trust_scores t
+            WHERE calculated_at = (SELECT MAX(calculated_at) FROM trust_scores l WHERE l.user_id = t.user_id)
+            GROUP BY user_id
+        """)
+        scores = [row['score'] for row in rows]
+        return cls([row['user_id'] for row in rows], scores, scorer.score_band_lookup(scores) if rows else [])
+
+    def score(self, user_id):
+        """Snapshot trust score, or None for users not in the snapshot"""
+        return self.scores.get(user_id)
+
+    def weight(self, user_id):
+        """Vote weight; users missing from the snapshot weigh nothing"""
+        return self.weights.get(user_id, 0.0)
+
+class ClaimVoteTally:
+    """
+    Records claim votes and keeps claims.votes_for / votes_against consistent with claim_votes
+
+    One vote per (claim_id, voter_id), enforced by a unique index, so retried or
+    duplicated submissions are no-ops. A batch is applied in a single IMMEDIATE
+    transaction: each touched claim's counters are read once, votes are inserted
+    in order, and one UPDATE per claim writes the new counters and any status
+    transition. claim_votes is never re-counted. Counters are written as increments.
+    Threads sharing the store serialise on its transaction lock and other processes
+    on the SQLite write lock, so counters are never lost. Votes queued by submit are applied when batch_size are waiting
+    or max_wait seconds after the first of them was queued, whichever comes first;
+    a batch whose flush fails goes back to the front of the queue.
+
+    With a TrustScoreSnapshot the tally is trust-weighted: only members in the
+    snapshot scoring at least the pool's trust_threshold may vote, and the claim
+    resolves on weighted totals kept in claim_weighted_tallies. A claim's total
+    eligible weight is recomputed once per batch from its current eligible voters
+    plus anyone who already voted, so it always covers the weight cast; each vote
+    is then an O(1) update. A claim with no eligible weight falls back to the
+    unweighted decide_claim. The plain votes_for / votes_against counters are
+    maintained in both modes.
+    """
+
+    def __init__(self, store, batch_size=500, snapshot=None, max_wait=1.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.snapshot = snapshot
+        self.max_wait = max_wait
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        store.connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_claim_votes_claim_id_voter_id ON claim_votes (claim_id, voter_id)"
+        )
+        if snapshot is not None:
+            store.connection.execute(WEIGHTED_TALLY_DDL)
+
+    def _load_claim(self, connection, claim_id):
+        """Counters, eligible voters and (weighted mode) weighted totals for one claim"""
+        row = connection.execute(
+            "SELECT c.pool_id, c.claimant_id, c.status, c.votes_for, c.votes_against, c.total_votes_required, "
+            "p.trust_threshold FROM claims c LEFT JOIN pools p ON p.pool_id = c.pool_id WHERE c.claim_id = ?",
+            (claim_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        claim = dict(row)
+        claim['voters'] = {member for member, in connection.execute(
+            "SELECT user_id FROM pool_members WHERE pool_id = ? AND status = 'active'", (claim['pool_id'],)
+        )} - {claim['claimant_id']}
+        if claim['total_votes_required'] is None:
+            claim['total_votes_required'] = len(claim['voters'])
+        claim['changed'] = False
+        claim['delta'] = {'votes_for': 0, 'votes_against': 0, 'weight_for': 0.0, 'weight_against': 0.0}
+
+        if self.snapshot is not None:
+            threshold = claim['trust_threshold'] or 0
+            claim['voters'] = {
+                voter for voter in claim['voters']
+                if self.snapshot.score(voter) is not None and self.snapshot.score(voter) >= threshold
+            }
+            voted = {voter for voter, in connection.execute(
+                "SELECT voter_id FROM claim_votes WHERE claim_id = ?", (claim_id,)
+            )}
+            total_weight = sum(self.snapshot.weight(voter) for voter in claim['voters'] | voted)
+            tally = connection.execute(
+                "SELECT weight_for, weight_against FROM claim_weighted_tallies WHERE claim_id = ?", (claim_id,)
+            ).fetchone()
+            if tally is None:
+                tally = (0.0, 0.0)
+                connection.execute(
+                    "INSERT INTO claim_weighted_tallies (claim_id, weight_for, weight_against, total_weight) "
+                    "VALUES (?, ?, ?, ?)", (claim_id, *tally, total_weight)
+                )
+            claim['weight_for'], claim['weight_against'] = tally
+            claim['total_weight'] = total_weight
+        return claim
+
+    def record_votes(self, votes):
+        """
+        Apply a batch of vote dicts (claim_id, voter_id, vote, optional reason/vote_id)
+        Returns counts of recorded, duplicate and refused votes plus the claims resolved
+        by this batch as {claim_id: status}. Votes are refused when the vote value is
+        not one of VOTE_CHOICES, the claim is not open for voting, or the voter is the
+        claimant, not an active pool member, or (weighted mode) below the pool's
+        trust_threshold in the snapshot. A refused vote never affects the rest of the batch.
+        """
+        summary = {'recorded': 0, 'duplicates': 0, 'refused': 0, 'resolved': {}}
+        votes = list(votes)
+        if not votes:
+            return summary
+
+        now = datetime.now().isoformat(sep=' ', timespec='seconds')
+        with self.store.transaction() as connection:
+            claims = {}
+            for claim_id in dict.fromkeys(vote['claim_id'] for vote in votes):
+                claim = self._load_claim(connection, claim_id)
+                if claim is not None:
+                    claims[claim_id] = claim
+
+            for vote in votes:
+                claim = claims.get(vote['claim_id'])
+                if (vote.get('vote') not in VOTE_CHOICES or claim is None or claim['status'] != 'voting'
+                        or vote['voter_id'] not in claim['voters']):
+                    summary['refused'] += 1
+                    continue
+
+                inserted = connection.execute(
+                    "INSERT OR IGNORE INTO claim_votes (vote_id, claim_id, voter_id, vote, reason, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (vote.get('vote_id') or str(uuid.uuid4()), vote['claim_id'], vote['voter_id'],
+                     vote['vote'], vote.get('reason'), now)
+                ).rowcount
+                if not inserted:
+                    summary['duplicates'] += 1
+                    continue
+
+                summary['recorded'] += 1
+                claim['changed'] = True
+                counter = 'votes_for' if vote['vote'] == 'approve' else 'votes_against'
+                claim[counter] += 1
+                claim['delta'][counter] += 1
+                if self.snapshot is not None:
+                    weight = 'weight_for' if vote['vote'] == 'approve' else 'weight_against'
+                    claim[weight] += self.snapshot.weight(vote['voter_id'])
+                    claim['delta'][weight] += self.snapshot.weight(vote['voter_id'])
+                if self.snapshot is None or claim['total_weight'] == 0:
+                    claim['status'] = decide_claim(claim['votes_for'], claim['votes_against'],
+                                                   claim['total_votes_required'])
+                else:
+                    claim['status'] = decide_weighted_claim(claim['weight_for'], claim['weight_against'],
+                                                            claim['total_weight'])
+                if claim['status'] != 'voting':
+                    summary['resolved'][vote['claim_id']] = claim['status']
+
+            for claim_id, claim in claims.items():
+                if not claim['changed']:
+                    continue
+                connection.execute(
+                    "UPDATE claims SET votes_for = votes_for + ?, votes_against = votes_against + ?, "
+                    "total_votes_required = ?, status = ?, "
+                    "resolved_at = CASE WHEN ? != 'voting' THEN ? ELSE resolved_at END WHERE claim_id = ?",
+                    (claim['delta']['votes_for'], claim['delta']['votes_against'], claim['total_votes_required'],
+                     claim['status'], claim['status'], now, claim_id)
+                )
+                if self.snapshot is not None:
+                    connection.execute(
+                        "UPDATE claim_weighted_tallies SET weight_for = weight_for + ?, "
+                        "weight_against = weight_against + ?, total_weight = ? WHERE claim_id = ?",
+                        (claim['delta']['weight_for'], claim['delta']['weight_against'], claim['total_weight'],
+                         claim_id)
+                    )
+        return summary
+
+    def submit(self, vote):
+        """
+        Queue one vote from any thread; the batch is applied once batch_size votes are
+        queued, or by a background flush max_wait seconds after the oldest queued vote
+        Raises ValueError for a vote value outside VOTE_CHOICES before queueing it.
+        """
+        if vote.get('vote') not in VOTE_CHOICES:
+            raise ValueError(f"Vote must be one of {VOTE_CHOICES}: {vote.get('vote')!r}")
+        with self._lock:
+            self._pending.append(vote)
+            if len(self._pending) < self.batch_size:
+                self._arm_timer()
+                return None
+            batch = self._take_pending()
+        return self._apply(batch)
+
+    def _arm_timer(self):
+        """Start the max-wait flush for the queued votes if none is running; caller holds _lock"""
+        if self._timer is None and self.max_wait is not None and self._pending:
+            self._timer = threading.Timer(self.max_wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _take_pending(self):
+        """Detach the queued votes and cancel their max-wait flush; caller holds _lock"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _apply(self, batch):
+        """record_votes for a detached batch, requeued at the front if it fails"""
+        try:
+            return self.record_votes(batch)
+        except Exception:
+            with self._lock:
+                self._pending[:0] = batch
+                self._arm_timer()
+            raise
+
+    def flush(self):
+        """Apply any queued votes now"""
+        with self._lock:
+            batch = self._take_pending()
+        return self._apply(batch)